@@ -4,8 +4,7 @@
 
 import os
 import time
-import hmac
-import hashlib
+from hmac import digest as _hmac_digest
 import requests
 import json
 from dotenv import load_dotenv
@@ -22,17 +21,21 @@ api_secret = os.getenv('BYBIT_API_SECRET', '').strip()
 BASE_URL = "https://api.bybit.com"
 RECV_WINDOW = "5000"
 
+# HTTPセッション（接続を再利用）
+session = requests.Session()
+session.headers.update({
+    'X-BAPI-API-KEY': api_key,
+    'X-BAPI-RECV-WINDOW': RECV_WINDOW,
+    'Content-Type': 'application/json'
+})
+
 def generate_signature(params: str, api_secret: str) -> str:
     """署名を生成"""
-    return hmac.new(
-        api_secret.encode('utf-8'),
-        params.encode('utf-8'),
-        hashlib.sha256
-    ).hexdigest()
+    return _hmac_digest(api_secret.encode('utf-8'), params.encode('utf-8'), 'sha256').hex()
 
 def get_wallet_balance():
     """残高を取得"""
-    timestamp = str(int(time.time() * 1000))
+    timestamp = str(time.time_ns() // 1_000_000)
     params = {'accountType': 'UNIFIED'}
     
     query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
@@ -40,15 +43,12 @@ def get_wallet_balance():
     signature = generate_signature(param_str, api_secret)
     
     headers = {
-        'X-BAPI-API-KEY': api_key,
         'X-BAPI-SIGN': signature,
-        'X-BAPI-TIMESTAMP': timestamp,
-        'X-BAPI-RECV-WINDOW': RECV_WINDOW,
-        'Content-Type': 'application/json'
+        'X-BAPI-TIMESTAMP': timestamp
     }
     
     url = f"{BASE_URL}/v5/account/wallet-balance"
-    response = requests.get(url, params=params, headers=headers)
+    response = session.get(url, params=params, headers=headers)
     
     return response.json()
 
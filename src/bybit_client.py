@@ -3,17 +3,105 @@ Bybit API クライアントモジュール（直接API呼び出し版）
 本番環境対応
 """
 
+import math
 import time
-import hmac
 import hashlib
+import socket
+import ssl
+import threading
+import numpy as np
+import orjson
 import requests
-from typing import Dict, List, Optional, Any
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from decimal import Decimal, ROUND_DOWN
 
+from bybit_ws_client import BybitWSClient
+from rate_limiter import RateLimiter
+
+
+# ローソク足の構造化配列の型
+KLINE_DTYPE = np.dtype([
+    ('timestamp', 'i8'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8')
+])
+
+# プール接続のソケットオプション（Nagle無効化・keep-alive）
+_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+]
+if hasattr(socket, 'TCP_KEEPIDLE'):
+    # Linux: アイドル接続がNAT等で切断される前にkeep-aliveを送る
+    _SOCKET_OPTIONS.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30))
+
+
+def _hmac_sha256_hex(key: bytes) -> Callable[[bytes], str]:
+    """
+    HMAC-SHA256（16進文字列）を計算する関数を生成
+    
+    ipad/opadを適用したハッシュ状態を事前に作っておき、呼び出しごとにコピーして使う
+    （hmac.newやhmac.digestが毎回行う鍵のパディングとハッシュ初期化を省く）
+    
+    Args:
+        key: 秘密鍵
+        
+    Returns:
+        メッセージを受け取り署名を返す関数
+    """
+    block_size = hashlib.sha256().block_size
+    if len(key) > block_size:
+        key = hashlib.sha256(key).digest()
+    key = key.ljust(block_size, b'\0')
+    
+    inner = hashlib.sha256(bytes(b ^ 0x36 for b in key))
+    outer = hashlib.sha256(bytes(b ^ 0x5c for b in key))
+    
+    def sign(message: bytes) -> str:
+        h = inner.copy()
+        h.update(message)
+        o = outer.copy()
+        o.update(h.digest())
+        return o.hexdigest()
+    
+    return sign
+
+
+class _TunedHTTPAdapter(HTTPAdapter):
+    """TCP_NODELAY・keep-aliveを設定したHTTPアダプタ"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = _SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
 
 class BybitClient:
     """Bybit APIクライアント"""
     
+    # 一括発注APIの1リクエストあたりの最大注文数
+    BATCH_ORDER_LIMIT = 20
+    
+    # 発注APIのレート制限（リクエスト/秒）
+    ORDER_RATE_LIMIT = 10
+    
+    # 銘柄情報（ティックサイズ等）の再取得間隔（秒）
+    INSTRUMENT_INFO_TTL = 24 * 60 * 60
+    
+    # 銘柄情報の取得に失敗したときの再試行間隔（秒）
+    INSTRUMENT_INFO_RETRY = 60
+    
+    # 残高取得のクエリ文字列（固定）
+    QS_BALANCE = "accountType=UNIFIED"
+    
+    # プール接続を温めておくための軽量リクエストの間隔（秒）
+    KEEPALIVE_INTERVAL = 20.0
+    
     def __init__(self, config, logger):
         """初期化"""
         self.config = config
@@ -22,27 +110,218 @@ class BybitClient:
         # API設定
         self.api_key = config.api_key
         self.api_secret = config.api_secret
+        self._hmac_hex = _hmac_sha256_hex(self.api_secret.encode('utf-8'))
         self.base_url = "https://api-testnet.bybit.com" if config.testnet else "https://api.bybit.com"
         self.recv_window = "5000"
         
+        # HTTPリクエストのタイムアウト（接続が止まってもメインループ・ワーカーを塞がない）
+        self._timeout = config.api_timeout
+        # 注文の精度（数量刻み・ティックサイズ）。起動時に取引所の銘柄情報で上書きする
+        self._qty_step = 0.001
+        self._qty_decimals = 3
+        self._price_tick = 0.1
+        self._price_decimals = 1
+        self._instrument_info_due = 0.0  # 次に銘柄情報を取得する時刻（time.monotonic()基準）
+        
+        # 署名文字列のうちタイムスタンプ直後に続く固定部分
+        self._sig_key_part = f"{self.api_key}{self.recv_window}"
+        
+        # HTTPセッション（keep-aliveでTCP/TLS接続を再利用）
+        self.session = requests.Session()
+        adapter = _TunedHTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.2)
+        )
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'X-BAPI-API-KEY': self.api_key,
+            'X-BAPI-RECV-WINDOW': self.recv_window
+        })
+        
+        # エンドポイントごとの署名関数（クエリの書式を初期化時に固定）
+        self._sign_balance = self._build_signer('/v5/account/wallet-balance', self.QS_BALANCE)
+        self._sign_ticker = self._build_signer('/v5/market/tickers', "category=linear&symbol=%s")
+        self._sign_klines = self._build_signer('/v5/market/kline', "category=linear&interval=%s&limit=%d&symbol=%s")
+        self._sign_open_orders = self._build_signer('/v5/order/realtime', "category=linear&symbol=%s")
+        self._sign_order_history = self._build_signer('/v5/order/history', "category=linear&limit=%d&symbol=%s")
+        self._sign_position = self._build_signer('/v5/position/list', "category=linear&symbol=%s")
+        self._sign_instruments = self._build_signer('/v5/market/instruments-info', "category=linear&symbol=%s")
+        
+        # 残高キャッシュ（約定・注文変更時のみ残高が変わるため短いTTLで再利用）
+        self._balance_cache = None
+        self._balance_cache_ts = 0.0
+        self._balance_ttl = 1.0
+        
+        # 並列ポーリング用のスレッドプール（セッションの接続プールを共有）
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='bybit')
+        
+        # 発注リクエストのレート制限（並列発注時もAPI制限内に収める）
+        self._order_limiter = RateLimiter(self.ORDER_RATE_LIMIT)
+        
+        # 接続維持スレッド（start_keepaliveで開始）
+        self._keepalive_stop = threading.Event()
+        self._keepalive_thread = None
+        
+        # 署名に使うハッシュ実装を確認（SHA拡張命令の有無はOpenSSLのビルドに依存）
+        self.logger.debug(f"HMAC backend: {hashlib.sha256().name} via {ssl.OPENSSL_VERSION}")
+        if ssl.OPENSSL_VERSION_INFO < (1, 1, 1):
+            self.logger.warning(
+                f"{ssl.OPENSSL_VERSION} is older than 1.1.1; "
+                "HMAC-SHA256 signing may not use hardware SHA extensions"
+            )
+        
+        # WebSocketストリーム（ティッカー・ポジション・注文・残高をプッシュで受信）
+        self.ws = None
+        if config.use_websocket:
+            self.ws = BybitWSClient(config, logger, self._generate_signature)
+            self.ws.start()
+        
         self.logger.info(f"Bybit client initialized (Testnet: {config.testnet}, URL: {self.base_url})")
         
+        # 銘柄の精度情報を取得
+        self._load_instrument_info()
+        
         # レバレッジを設定
         self._set_leverage()
     
+    def start_keepalive(self):
+        """アイドル中も接続が切られないよう定期的にサーバー時刻を取得するスレッドを開始（発注時のTLS再接続を避ける）"""
+        if self._keepalive_thread is not None:
+            return
+        self._keepalive_thread = threading.Thread(
+            target=self._keepalive_loop, name='bybit-keepalive', daemon=True
+        )
+        self._keepalive_thread.start()
+    
+    def _keepalive_loop(self):
+        """KEEPALIVE_INTERVALごとに公開エンドポイントへアクセスしてプール接続を維持"""
+        url = f"{self.base_url}/v5/market/time"
+        while not self._keepalive_stop.wait(self.KEEPALIVE_INTERVAL):
+            try:
+                self.session.get(url, timeout=self._timeout)
+            except Exception as e:
+                self.logger.debug("Keep-alive request failed: %s", e)
+    
     def _generate_signature(self, params: str) -> str:
         """署名を生成"""
-        return hmac.new(
-            self.api_secret.encode('utf-8'),
-            params.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
+        return self._hmac_hex(params.encode('utf-8'))
+    
+    def _sign(self, timestamp: str, payload: str) -> Dict[str, str]:
+        """署名付きリクエスト用のヘッダーを生成（固定ヘッダーはセッションに設定済み）"""
+        signature = self._generate_signature(''.join((timestamp, self._sig_key_part, payload)))
+        return {
+            'X-BAPI-SIGN': signature,
+            'X-BAPI-TIMESTAMP': timestamp
+        }
+    
+    def _build_signer(self, path: str, template: str) -> Callable[..., Tuple[str, Dict[str, str]]]:
+        """
+        GETエンドポイント専用の署名関数を生成
+        
+        Args:
+            path: APIパス（例: /v5/market/tickers）
+            template: キー順にソート済みのクエリ文字列の書式（%s/%d で可変部分を指定）
+            
+        Returns:
+            可変部分の値を受け取り (URL, ヘッダー) を返す関数
+        """
+        url_prefix = f"{self.base_url}{path}?"
+        key_part = self._sig_key_part
+        hmac_hex = self._hmac_hex
+        
+        def signer(*values) -> Tuple[str, Dict[str, str]]:
+            query = template % values if values else template
+            timestamp = str(time.time_ns() // 1_000_000)
+            signature = hmac_hex(''.join((timestamp, key_part, query)).encode('utf-8'))
+            return url_prefix + query, {'X-BAPI-SIGN': signature, 'X-BAPI-TIMESTAMP': timestamp}
+        
+        return signer
+    
+    def _signed_get(self, signer: Callable[..., Tuple[str, Dict[str, str]]], *values) -> Dict[str, Any]:
+        """事前生成した署名関数でGETリクエストを送信"""
+        url, headers = signer(*values)
+        return orjson.loads(self.session.get(url, headers=headers, timeout=self._timeout).content)
+    
+    def _signed_request(self, method: str, path: str, params: Dict = None, body: Dict = None) -> Dict[str, Any]:
+        """
+        署名付きリクエストを送信
+        
+        Args:
+            method: 'GET' または 'POST'
+            path: APIパス（例: /v5/order/create）
+            params: GETのクエリパラメータ
+            body: POSTのJSONボディ
+            
+        Returns:
+            APIレスポンス（JSON）
+        """
+        url = self.base_url + path
+        
+        if method == 'GET':
+            # 署名したクエリ文字列をそのまま送信（署名対象と送信内容を一致させる）
+            payload = '&'.join([f"{k}={v}" for k, v in sorted(params.items())]) if params else ''
+            headers = self._sign(str(time.time_ns() // 1_000_000), payload)
+            response = self.session.get(
+                f"{url}?{payload}" if payload else url, headers=headers, timeout=self._timeout
+            )
+        else:
+            # JSONボディは1回だけ生成し、署名したバイト列をそのまま送信
+            data = orjson.dumps(body)
+            headers = self._sign(str(time.time_ns() // 1_000_000), data.decode('utf-8'))
+            response = self.session.post(url, data=data, headers=headers, timeout=self._timeout)
+        
+        return orjson.loads(response.content)
+    
+    def fetch_concurrently(self, **calls: Callable[[], Any]) -> Dict[str, Any]:
+        """
+        独立したAPI呼び出しを並列実行
+        
+        Args:
+            calls: 名前 -> 引数なしの呼び出し（例: balance=client.get_balance）
+            
+        Returns:
+            名前 -> 結果の辞書
+        """
+        futures = {name: self._executor.submit(fn) for name, fn in calls.items()}
+        return {name: future.result() for name, future in futures.items()}
+    
+    def _load_instrument_info(self):
+        """銘柄の数量刻み・ティックサイズを取得してキャッシュ（失敗時はINSTRUMENT_INFO_RETRY後に再試行）"""
+        self._instrument_info_due = time.monotonic() + self.INSTRUMENT_INFO_RETRY
+        
+        try:
+            result = self._signed_get(self._sign_instruments, self.config.symbol)
+            
+            if result['retCode'] == 0 and result['result']['list']:
+                info = result['result']['list'][0]
+                price_tick = Decimal(info['priceFilter']['tickSize'])
+                qty_step = Decimal(info['lotSizeFilter']['qtyStep'])
+                
+                self._price_tick = float(price_tick)
+                self._price_decimals = max(0, -price_tick.normalize().as_tuple().exponent)
+                self._qty_step = float(qty_step)
+                self._qty_decimals = max(0, -qty_step.normalize().as_tuple().exponent)
+                self._instrument_info_due = time.monotonic() + self.INSTRUMENT_INFO_TTL
+                
+                self.logger.info(
+                    f"Instrument precision: tick={self._price_tick}, qty_step={self._qty_step}"
+                )
+            else:
+                self.logger.warning(f"Failed to get instrument info: {result['retMsg']}")
+                
+        except Exception as e:
+            self.logger.warning(f"Failed to get instrument info: {e}")
+    
+    def _refresh_instrument_info(self):
+        """精度情報が古ければ再取得"""
+        if time.monotonic() >= self._instrument_info_due:
+            self._load_instrument_info()
     
     def _set_leverage(self):
         """レバレッジを設定"""
         try:
-            import json
-            timestamp = str(int(time.time() * 1000))
             params = {
                 'category': 'linear',
                 'symbol': self.config.symbol,
@@ -50,22 +329,7 @@ class BybitClient:
                 'sellLeverage': str(self.config.leverage)
             }
             
-            # POSTリクエストの場合はJSONボディを使用
-            json_body = json.dumps(params)
-            param_str = f"{timestamp}{self.api_key}{self.recv_window}{json_body}"
-            signature = self._generate_signature(param_str)
-            
-            headers = {
-                'X-BAPI-API-KEY': self.api_key,
-                'X-BAPI-SIGN': signature,
-                'X-BAPI-TIMESTAMP': timestamp,
-                'X-BAPI-RECV-WINDOW': self.recv_window,
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.base_url}/v5/position/set-leverage"
-            response = requests.post(url, json=params, headers=headers)
-            result = response.json()
+            result = self._signed_request('POST', '/v5/position/set-leverage', body=params)
             
             if result['retCode'] == 0:
                 self.logger.info(f"Leverage set to {self.config.leverage}x")
@@ -75,27 +339,24 @@ class BybitClient:
         except Exception as e:
             self.logger.warning(f"Failed to set leverage: {e}")
     
-    def get_balance(self) -> Dict[str, Any]:
-        """残高を取得"""
+    def get_balance(self, force: bool = False) -> Dict[str, Any]:
+        """
+        残高を取得
+        
+        Args:
+            force: Trueの場合はキャッシュを無視してAPIから取得
+        """
+        if not force and self.ws:
+            cached = self.ws.get_balance()
+            if cached:
+                return cached
+        
+        now = time.monotonic()
+        if not force and self._balance_cache and now - self._balance_cache_ts < self._balance_ttl:
+            return self._balance_cache
+        
         try:
-            timestamp = str(int(time.time() * 1000))
-            params = {'accountType': 'UNIFIED'}
-            
-            query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-            param_str = f"{timestamp}{self.api_key}{self.recv_window}{query_string}"
-            signature = self._generate_signature(param_str)
-            
-            headers = {
-                'X-BAPI-API-KEY': self.api_key,
-                'X-BAPI-SIGN': signature,
-                'X-BAPI-TIMESTAMP': timestamp,
-                'X-BAPI-RECV-WINDOW': self.recv_window,
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.base_url}/v5/account/wallet-balance"
-            response = requests.get(url, params=params, headers=headers)
-            result = response.json()
+            result = self._signed_get(self._sign_balance)
             
             if result['retCode'] == 0:
                 coins = result['result']['list'][0]['coin']
@@ -109,8 +370,15 @@ class BybitClient:
                             'available': available_balance,
                             'used': wallet_balance - available_balance
                         }
-                        return balance
-                return {'total': 0.0, 'available': 0.0, 'used': 0.0}
+                        break
+                else:
+                    balance = {'total': 0.0, 'available': 0.0, 'used': 0.0}
+                
+                self._balance_cache = balance
+                self._balance_cache_ts = now
+                if self.ws:
+                    self.ws.seed_balance(balance)
+                return balance
             else:
                 self.logger.error(f"Failed to get balance: {result['retMsg']}")
                 return None
@@ -119,30 +387,22 @@ class BybitClient:
             self.logger.error(f"Error getting balance: {e}")
             return None
     
+    def invalidate_balance_cache(self):
+        """残高キャッシュを破棄（注文・キャンセル後に呼び出す）"""
+        self._balance_cache = None
+    
     def get_ticker(self, symbol: str = None) -> Optional[Dict[str, Any]]:
         """ティッカー情報を取得"""
         if symbol is None:
             symbol = self.config.symbol
         
+        if self.ws and symbol == self.config.symbol:
+            cached = self.ws.get_ticker()
+            if cached:
+                return cached
+        
         try:
-            timestamp = str(int(time.time() * 1000))
-            params = {'category': 'linear', 'symbol': symbol}
-            
-            query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-            param_str = f"{timestamp}{self.api_key}{self.recv_window}{query_string}"
-            signature = self._generate_signature(param_str)
-            
-            headers = {
-                'X-BAPI-API-KEY': self.api_key,
-                'X-BAPI-SIGN': signature,
-                'X-BAPI-TIMESTAMP': timestamp,
-                'X-BAPI-RECV-WINDOW': self.recv_window,
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.base_url}/v5/market/tickers"
-            response = requests.get(url, params=params, headers=headers)
-            result = response.json()
+            result = self._signed_get(self._sign_ticker, symbol)
             
             if result['retCode'] == 0:
                 ticker_data = result['result']['list'][0]
@@ -160,43 +420,28 @@ class BybitClient:
             self.logger.error(f"Error getting ticker: {e}")
             return None
     
-    def get_klines(self, symbol: str = None, interval: str = "60", limit: int = 200) -> Optional[List[Dict]]:
-        """ローソク足データを取得"""
+    def get_klines(self, symbol: str = None, interval: str = "60", limit: int = 200) -> Optional[np.ndarray]:
+        """
+        ローソク足データを取得
+        
+        Returns:
+            KLINE_DTYPEの構造化配列（古い順）。各フィールドは klines['close'] のように列として取得できる
+        """
         if symbol is None:
             symbol = self.config.symbol
         
         try:
-            timestamp = str(int(time.time() * 1000))
-            params = {'category': 'linear', 'symbol': symbol, 'interval': interval, 'limit': str(limit)}
-            
-            query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-            param_str = f"{timestamp}{self.api_key}{self.recv_window}{query_string}"
-            signature = self._generate_signature(param_str)
-            
-            headers = {
-                'X-BAPI-API-KEY': self.api_key,
-                'X-BAPI-SIGN': signature,
-                'X-BAPI-TIMESTAMP': timestamp,
-                'X-BAPI-RECV-WINDOW': self.recv_window,
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.base_url}/v5/market/kline"
-            response = requests.get(url, params=params, headers=headers)
-            result = response.json()
+            result = self._signed_get(self._sign_klines, interval, limit, symbol)
             
             if result['retCode'] == 0:
-                klines = []
-                for k in result['result']['list']:
-                    klines.append({
-                        'timestamp': int(k[0]),
-                        'open': float(k[1]),
-                        'high': float(k[2]),
-                        'low': float(k[3]),
-                        'close': float(k[4]),
-                        'volume': float(k[5])
-                    })
-                klines.reverse()
+                rows = result['result']['list']
+                klines = np.empty(len(rows), dtype=KLINE_DTYPE)
+                if rows:
+                    # 文字列の2次元配列を一括で数値化（APIは新しい順なので反転）
+                    raw = np.array([k[:6] for k in rows], dtype=np.float64)[::-1]
+                    klines['timestamp'] = raw[:, 0]
+                    for i, name in enumerate(KLINE_DTYPE.names[1:], start=1):
+                        klines[name] = raw[:, i]
                 return klines
             return None
                 
@@ -209,11 +454,12 @@ class BybitClient:
         if symbol is None:
             symbol = self.config.symbol
         
+        self._refresh_instrument_info()
+        
         try:
             qty_str = self._format_quantity(qty)
             price_str = self._format_price(price)
             
-            timestamp = str(int(time.time() * 1000))
             params = {
                 'category': 'linear',
                 'symbol': symbol,
@@ -227,25 +473,11 @@ class BybitClient:
             if order_link_id:
                 params['orderLinkId'] = order_link_id
             
-            # POSTリクエストの場合はJSONボディを使用
-            import json
-            json_body = json.dumps(params)
-            param_str = f"{timestamp}{self.api_key}{self.recv_window}{json_body}"
-            signature = self._generate_signature(param_str)
-            
-            headers = {
-                'X-BAPI-API-KEY': self.api_key,
-                'X-BAPI-SIGN': signature,
-                'X-BAPI-TIMESTAMP': timestamp,
-                'X-BAPI-RECV-WINDOW': self.recv_window,
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.base_url}/v5/order/create"
-            response = requests.post(url, json=params, headers=headers)
-            result = response.json()
+            self._order_limiter.acquire()
+            result = self._signed_request('POST', '/v5/order/create', body=params)
             
             if result['retCode'] == 0:
+                self.invalidate_balance_cache()
                 order_id = result['result']['orderId']
                 self.logger.info(f"Order placed: {side} {qty_str} @ {price_str} (ID: {order_id})")
                 return {
@@ -264,13 +496,94 @@ class BybitClient:
             self.logger.error(f"Error placing order: {e}")
             return None
     
+    def place_limit_orders_batch(self, orders: List[Dict], symbol: str = None) -> List[Optional[Dict]]:
+        """
+        指値注文をまとめて発注（/v5/order/create-batch）
+        
+        Args:
+            orders: 注文のリスト（各要素は side, qty, price, order_link_id(任意) を持つ辞書）
+            symbol: 取引ペア
+            
+        Returns:
+            入力と同じ順序の発注結果リスト（失敗した注文はNone）
+        """
+        if symbol is None:
+            symbol = self.config.symbol
+        
+        self._refresh_instrument_info()
+        
+        # チャンクを並列に送信（送信間隔はレート制限で制御）
+        futures = [
+            self._executor.submit(self._place_batch_chunk, orders[start:start + self.BATCH_ORDER_LIMIT], symbol)
+            for start in range(0, len(orders), self.BATCH_ORDER_LIMIT)
+        ]
+        return [result for future in futures for result in future.result()]
+    
+    def _place_batch_chunk(self, orders: List[Dict], symbol: str) -> List[Optional[Dict]]:
+        """1リクエスト分（最大BATCH_ORDER_LIMIT件）の一括発注"""
+        try:
+            requests_list = []
+            for order in orders:
+                request = {
+                    'symbol': symbol,
+                    'side': order['side'],
+                    'orderType': 'Limit',
+                    'qty': self._format_quantity(order['qty']),
+                    'price': self._format_price(order['price']),
+                    'timeInForce': 'PostOnly'
+                }
+                if order.get('order_link_id'):
+                    request['orderLinkId'] = order['order_link_id']
+                requests_list.append(request)
+            
+            params = {'category': 'linear', 'request': requests_list}
+            
+            self._order_limiter.acquire()
+            result = self._signed_request('POST', '/v5/order/create-batch', body=params)
+            
+            if result['retCode'] != 0:
+                self.logger.error(f"Failed to place batch orders: {result['retMsg']}")
+                return [None] * len(orders)
+            
+            self.invalidate_balance_cache()
+            
+            placed = result['result']['list']
+            statuses = result.get('retExtInfo', {}).get('list', [])
+            
+            results = []
+            for i, request in enumerate(requests_list):
+                status = statuses[i] if i < len(statuses) else {'code': 0}
+                if status.get('code', 0) != 0 or i >= len(placed) or not placed[i].get('orderId'):
+                    self.logger.error(
+                        f"Failed to place order: {request['side']} {request['qty']} @ {request['price']} "
+                        f"({status.get('msg', 'unknown error')})"
+                    )
+                    results.append(None)
+                    continue
+                
+                order_id = placed[i]['orderId']
+                self.logger.info(f"Order placed: {request['side']} {request['qty']} @ {request['price']} (ID: {order_id})")
+                results.append({
+                    'order_id': order_id,
+                    'order_link_id': placed[i].get('orderLinkId'),
+                    'symbol': symbol,
+                    'side': request['side'],
+                    'qty': float(request['qty']),
+                    'price': float(request['price'])
+                })
+            
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error placing batch orders: {e}")
+            return [None] * len(orders)
+    
     def cancel_order(self, order_id: str = None, order_link_id: str = None, symbol: str = None) -> bool:
         """注文をキャンセル"""
         if symbol is None:
             symbol = self.config.symbol
         
         try:
-            timestamp = str(int(time.time() * 1000))
             params = {'category': 'linear', 'symbol': symbol}
             
             if order_id:
@@ -280,25 +593,10 @@ class BybitClient:
             else:
                 return False
             
-            # POSTリクエストの場合はJSONボディを使用
-            import json
-            json_body = json.dumps(params)
-            param_str = f"{timestamp}{self.api_key}{self.recv_window}{json_body}"
-            signature = self._generate_signature(param_str)
-            
-            headers = {
-                'X-BAPI-API-KEY': self.api_key,
-                'X-BAPI-SIGN': signature,
-                'X-BAPI-TIMESTAMP': timestamp,
-                'X-BAPI-RECV-WINDOW': self.recv_window,
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.base_url}/v5/order/cancel"
-            response = requests.post(url, json=params, headers=headers)
-            result = response.json()
+            result = self._signed_request('POST', '/v5/order/cancel', body=params)
             
             if result['retCode'] == 0:
+                self.invalidate_balance_cache()
                 self.logger.info(f"Order cancelled: {order_id or order_link_id}")
                 return True
             return False
@@ -307,34 +605,72 @@ class BybitClient:
             self.logger.error(f"Error cancelling order: {e}")
             return False
     
+    def cancel_orders_batch(self, order_ids: List[str], symbol: str = None) -> List[bool]:
+        """
+        注文をまとめてキャンセル（/v5/order/cancel-batch）
+        
+        Args:
+            order_ids: キャンセルする注文IDのリスト
+            symbol: 取引ペア
+            
+        Returns:
+            入力と同じ順序のキャンセル結果リスト
+        """
+        if symbol is None:
+            symbol = self.config.symbol
+        
+        futures = [
+            self._executor.submit(self._cancel_batch_chunk, order_ids[start:start + self.BATCH_ORDER_LIMIT], symbol)
+            for start in range(0, len(order_ids), self.BATCH_ORDER_LIMIT)
+        ]
+        return [result for future in futures for result in future.result()]
+    
+    def _cancel_batch_chunk(self, order_ids: List[str], symbol: str) -> List[bool]:
+        """1リクエスト分（最大BATCH_ORDER_LIMIT件）の一括キャンセル"""
+        try:
+            params = {
+                'category': 'linear',
+                'request': [{'symbol': symbol, 'orderId': order_id} for order_id in order_ids]
+            }
+            
+            self._order_limiter.acquire()
+            result = self._signed_request('POST', '/v5/order/cancel-batch', body=params)
+            
+            if result['retCode'] != 0:
+                self.logger.error(f"Failed to cancel batch orders: {result['retMsg']}")
+                return [False] * len(order_ids)
+            
+            self.invalidate_balance_cache()
+            
+            statuses = result.get('retExtInfo', {}).get('list', [])
+            results = []
+            for i, order_id in enumerate(order_ids):
+                status = statuses[i] if i < len(statuses) else {'code': 0}
+                if status.get('code', 0) != 0:
+                    self.logger.error(f"Failed to cancel order {order_id}: {status.get('msg', 'unknown error')}")
+                    results.append(False)
+                else:
+                    self.logger.info(f"Order cancelled: {order_id}")
+                    results.append(True)
+            
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error cancelling batch orders: {e}")
+            return [False] * len(order_ids)
+    
     def cancel_all_orders(self, symbol: str = None) -> bool:
         """全ての注文をキャンセル"""
         if symbol is None:
             symbol = self.config.symbol
         
         try:
-            timestamp = str(int(time.time() * 1000))
             params = {'category': 'linear', 'symbol': symbol}
             
-            # POSTリクエストの場合はJSONボディを使用
-            import json
-            json_body = json.dumps(params)
-            param_str = f"{timestamp}{self.api_key}{self.recv_window}{json_body}"
-            signature = self._generate_signature(param_str)
-            
-            headers = {
-                'X-BAPI-API-KEY': self.api_key,
-                'X-BAPI-SIGN': signature,
-                'X-BAPI-TIMESTAMP': timestamp,
-                'X-BAPI-RECV-WINDOW': self.recv_window,
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.base_url}/v5/order/cancel-all"
-            response = requests.post(url, json=params, headers=headers)
-            result = response.json()
+            result = self._signed_request('POST', '/v5/order/cancel-all', body=params)
             
             if result['retCode'] == 0:
+                self.invalidate_balance_cache()
                 self.logger.info(f"All orders cancelled for {symbol}")
                 return True
             return False
@@ -348,25 +684,13 @@ class BybitClient:
         if symbol is None:
             symbol = self.config.symbol
         
+        if self.ws and symbol == self.config.symbol:
+            cached = self.ws.get_open_orders()
+            if cached is not None:
+                return cached
+        
         try:
-            timestamp = str(int(time.time() * 1000))
-            params = {'category': 'linear', 'symbol': symbol}
-            
-            query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-            param_str = f"{timestamp}{self.api_key}{self.recv_window}{query_string}"
-            signature = self._generate_signature(param_str)
-            
-            headers = {
-                'X-BAPI-API-KEY': self.api_key,
-                'X-BAPI-SIGN': signature,
-                'X-BAPI-TIMESTAMP': timestamp,
-                'X-BAPI-RECV-WINDOW': self.recv_window,
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.base_url}/v5/order/realtime"
-            response = requests.get(url, params=params, headers=headers)
-            result = response.json()
+            result = self._signed_get(self._sign_open_orders, symbol)
             
             if result['retCode'] == 0:
                 orders = []
@@ -382,6 +706,8 @@ class BybitClient:
                         'status': order['orderStatus'],
                         'created_time': order['createdTime']
                     })
+                if self.ws and symbol == self.config.symbol:
+                    self.ws.seed_open_orders(orders)
                 return orders
             return []
                 
@@ -389,30 +715,54 @@ class BybitClient:
             self.logger.error(f"Error getting open orders: {e}")
             return []
     
+    def wait_orders_closed(self, order_ids: List[str], timeout: float = 2.0) -> bool:
+        """
+        指定した注文が未約定注文から消えるまで待機（固定時間のsleepの代わり）
+        
+        WebSocket使用時はキャッシュを、未使用時はRESTを間隔を伸ばしながら確認する
+        
+        Args:
+            order_ids: 注文IDのリスト
+            timeout: 最大待機時間（秒）
+            
+        Returns:
+            すべて消えたらTrue（タイムアウト時はFalse）
+        """
+        pending = set(order_ids)
+        deadline = time.monotonic() + timeout
+        interval = 0.05
+        
+        while True:
+            open_ids = {order['order_id'] for order in self.get_open_orders()}
+            if pending.isdisjoint(open_ids):
+                return True
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.logger.warning(f"Timed out waiting for {len(pending & open_ids)} orders to close")
+                return False
+            
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, 0.2)
+    
+    def get_order_events(self) -> Dict[str, Dict]:
+        """
+        WebSocketで受信した注文終了イベント（約定・キャンセル等）を取り出す
+        
+        Returns:
+            注文ID -> イベント（WebSocket未使用時は空）
+        """
+        if self.ws:
+            return self.ws.drain_order_events()
+        return {}
+    
     def get_order_history(self, symbol: str = None, limit: int = 50) -> List[Dict]:
         """注文履歴を取得（最近の約定/キャンセル済み注文）"""
         if symbol is None:
             symbol = self.config.symbol
         
         try:
-            timestamp = str(int(time.time() * 1000))
-            params = {'category': 'linear', 'symbol': symbol, 'limit': str(limit)}
-            
-            query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-            param_str = f"{timestamp}{self.api_key}{self.recv_window}{query_string}"
-            signature = self._generate_signature(param_str)
-            
-            headers = {
-                'X-BAPI-API-KEY': self.api_key,
-                'X-BAPI-SIGN': signature,
-                'X-BAPI-TIMESTAMP': timestamp,
-                'X-BAPI-RECV-WINDOW': self.recv_window,
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.base_url}/v5/order/history"
-            response = requests.get(url, params=params, headers=headers)
-            result = response.json()
+            result = self._signed_get(self._sign_order_history, limit, symbol)
             
             if result['retCode'] == 0:
                 orders = []
@@ -442,29 +792,17 @@ class BybitClient:
         if symbol is None:
             symbol = self.config.symbol
         
+        if self.ws and symbol == self.config.symbol:
+            cached = self.ws.get_position()
+            if cached:
+                return cached
+        
         try:
-            timestamp = str(int(time.time() * 1000))
-            params = {'category': 'linear', 'symbol': symbol}
-            
-            query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-            param_str = f"{timestamp}{self.api_key}{self.recv_window}{query_string}"
-            signature = self._generate_signature(param_str)
-            
-            headers = {
-                'X-BAPI-API-KEY': self.api_key,
-                'X-BAPI-SIGN': signature,
-                'X-BAPI-TIMESTAMP': timestamp,
-                'X-BAPI-RECV-WINDOW': self.recv_window,
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"{self.base_url}/v5/position/list"
-            response = requests.get(url, params=params, headers=headers)
-            result = response.json()
+            result = self._signed_get(self._sign_position, symbol)
             
             if result['retCode'] == 0 and result['result']['list']:
                 pos = result['result']['list'][0]
-                return {
+                position = {
                     'symbol': pos['symbol'],
                     'side': pos['side'],
                     'size': float(pos['size']) if pos['size'] else 0.0,
@@ -472,6 +810,9 @@ class BybitClient:
                     'unrealized_pnl': float(pos['unrealisedPnl']) if pos['unrealisedPnl'] else 0.0,
                     'leverage': float(pos['leverage']) if pos['leverage'] else self.config.leverage
                 }
+                if self.ws and symbol == self.config.symbol:
+                    self.ws.seed_position(position)
+                return position
             return {
                 'symbol': symbol,
                 'side': 'None',
@@ -485,14 +826,69 @@ class BybitClient:
             self.logger.error(f"Error getting position: {e}")
             return None
     
-    def _format_quantity(self, qty: float) -> str:
-        """数量を適切な精度にフォーマット"""
-        decimal_qty = Decimal(str(qty))
-        formatted = decimal_qty.quantize(Decimal('0.001'), rounding=ROUND_DOWN)
-        return str(formatted)
-    
-    def _format_price(self, price: float) -> str:
-        """価格を適切な精度にフォーマット"""
-        decimal_price = Decimal(str(price))
-        formatted = decimal_price.quantize(Decimal('0.1'), rounding=ROUND_DOWN)
-        return str(formatted)
+    def close(self):
+        """WebSocketストリームとHTTPセッションを閉じる"""
+        self._keepalive_stop.set()
+        if self.ws:
+            self.ws.stop()
+        self._executor.shutdown(wait=False)
+        self.session.close()
+    
+    def format_order(self, qty: float, price: float) -> Tuple[str, str]:
+        """
+        数量・価格を取引所の刻みに丸めた文字列に変換（発注時と同じ丸め）
+        
+        Args:
+            qty: 数量
+            price: 価格
+            
+        Returns:
+            (数量の文字列, 価格の文字列)
+        """
+        return self._format_quantity(qty), self._format_price(price)
+    
+    def to_ticks(self, price: float) -> int:
+        """価格をティック数（整数）に変換"""
+        return round(price / self._price_tick)
+    
+    def to_lots(self, qty: float) -> int:
+        """数量を数量刻みの個数（整数）に変換"""
+        return round(qty / self._qty_step)
+    
+    @property
+    def tick_lot_value(self) -> float:
+        """1ティック×1数量刻みあたりの金額（USDT）"""
+        return self._price_tick * self._qty_step
+    
+    def _format_quantity(self, qty: float, strict: bool = False) -> str:
+        """
+        数量を適切な精度にフォーマット（刻み値で切り捨て）
+        
+        Args:
+            qty: 数量
+            strict: TrueならDecimalで厳密に計算（デバッグ用）
+        """
+        if strict:
+            decimal_qty = Decimal(str(qty))
+            formatted = decimal_qty.quantize(Decimal(str(self._qty_step)), rounding=ROUND_DOWN)
+            return str(formatted)
+        
+        # 浮動小数点の誤差（例: 0.3 / 0.1 = 2.999...）で1刻み落ちないよう微小値を加える
+        steps = math.floor(qty / self._qty_step + 1e-9)
+        return f"{steps * self._qty_step:.{self._qty_decimals}f}"
+    
+    def _format_price(self, price: float, strict: bool = False) -> str:
+        """
+        価格を適切な精度にフォーマット（ティックサイズで切り捨て）
+        
+        Args:
+            price: 価格
+            strict: TrueならDecimalで厳密に計算（デバッグ用）
+        """
+        if strict:
+            decimal_price = Decimal(str(price))
+            formatted = decimal_price.quantize(Decimal(str(self._price_tick)), rounding=ROUND_DOWN)
+            return str(formatted)
+        
+        ticks = math.floor(price / self._price_tick + 1e-9)
+        return f"{ticks * self._price_tick:.{self._price_decimals}f}"
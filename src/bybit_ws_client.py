@@ -0,0 +1,353 @@
+"""
+Bybit WebSocket クライアントモジュール
+ティッカー・板・ポジション・注文・残高のプッシュ配信を受信してキャッシュする
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any
+
+import orjson
+import websocket
+
+
+class BybitWSClient:
+    """Bybit V5 WebSocketクライアント"""
+
+    # 未約定とみなす注文ステータス
+    OPEN_ORDER_STATUSES = {'New', 'PartiallyFilled', 'Untriggered'}
+
+    # ティッカーキャッシュの有効期限（秒）
+    TICKER_MAX_AGE = 5.0
+
+    # 再接続までの待機時間（秒）
+    RECONNECT_DELAY = 5.0
+
+    def __init__(self, config, logger, signer: Callable[[str], str]):
+        """
+        初期化
+
+        Args:
+            config: 設定オブジェクト
+            logger: ロガーオブジェクト
+            signer: 署名関数（BybitClientのHMAC-SHA256署名を共有）
+        """
+        self.config = config
+        self.logger = logger
+        self._sign = signer
+
+        if config.testnet:
+            self.public_url = "wss://stream-testnet.bybit.com/v5/public/linear"
+            self.private_url = "wss://stream-testnet.bybit.com/v5/private"
+        else:
+            self.public_url = "wss://stream.bybit.com/v5/public/linear"
+            self.private_url = "wss://stream.bybit.com/v5/private"
+
+        self._lock = threading.Lock()
+        self._running = False
+        self._threads: List[threading.Thread] = []
+        self._apps: List[websocket.WebSocketApp] = []
+
+        # 接続状態
+        self._public_connected = False
+        self._private_ready = False
+
+        # キャッシュ（プライベートはRESTで初期化されるまで無効）
+        self._ticker_cache: Dict[str, Any] = {}
+        self._ticker_ts = 0.0
+        self._position_cache: Optional[Dict] = None
+        self._orders_cache: Optional[Dict[str, Dict]] = None
+        # 未約定注文キャッシュの初期化前に受信した注文の最新状態（終了した注文はNone）
+        self._pending_orders: Dict[str, Optional[Dict]] = {}
+        self._wallet_cache: Optional[Dict] = None
+        
+        # 未約定でなくなった注文（約定・キャンセル等）のイベント
+        self._order_events: queue.Queue = queue.Queue()
+
+    def start(self):
+        """パブリック・プライベート両ストリームを別スレッドで開始"""
+        if self._running:
+            return
+        self._running = True
+
+        for url, on_open in ((self.public_url, self._on_public_open),
+                             (self.private_url, self._on_private_open)):
+            thread = threading.Thread(
+                target=self._run_forever,
+                args=(url, on_open),
+                name=f"bybit-ws-{url.rsplit('/', 1)[-1]}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        self.logger.info("WebSocket streams started")
+
+    def stop(self):
+        """ストリームを停止"""
+        self._running = False
+        for app in list(self._apps):
+            app.close()
+
+    def _run_forever(self, url: str, on_open: Callable):
+        """切断時は自動で再接続するループ"""
+        while self._running:
+            app = websocket.WebSocketApp(
+                url,
+                on_open=on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            self._apps.append(app)
+            try:
+                app.run_forever(ping_interval=20, ping_timeout=10)
+            except Exception as e:
+                self.logger.warning(f"WebSocket error ({url}): {e}")
+            finally:
+                self._apps.remove(app)
+                self._mark_disconnected(url)
+
+            if self._running:
+                time.sleep(self.RECONNECT_DELAY)
+
+    def _mark_disconnected(self, url: str):
+        """切断時の状態更新（取りこぼしがあり得るためプライベートキャッシュは破棄）"""
+        with self._lock:
+            if url == self.public_url:
+                self._public_connected = False
+                self._ticker_cache = {}
+            else:
+                self._private_ready = False
+                self._position_cache = None
+                self._orders_cache = None
+                self._pending_orders = {}
+                self._wallet_cache = None
+
+    def _on_public_open(self, ws):
+        """パブリックストリーム接続時"""
+        symbol = self.config.symbol
+        ws.send(orjson.dumps({'op': 'subscribe', 'args': [f"tickers.{symbol}", f"orderbook.1.{symbol}"]}).decode('utf-8'))
+        with self._lock:
+            self._public_connected = True
+
+    def _on_private_open(self, ws):
+        """プライベートストリーム接続時（認証してから購読）"""
+        expires = time.time_ns() // 1_000_000 + 10_000
+        signature = self._sign(f"GET/realtime{expires}")
+        ws.send(orjson.dumps({'op': 'auth', 'args': [self.config.api_key, expires, signature]}).decode('utf-8'))
+
+    def _on_error(self, ws, error):
+        """エラー時"""
+        self.logger.warning(f"WebSocket error: {error}")
+
+    def _on_close(self, ws, status_code, message):
+        """切断時"""
+        if self._running:
+            self.logger.warning(f"WebSocket closed ({status_code}): {message}")
+
+    def _on_message(self, ws, message: str):
+        """受信メッセージを振り分け"""
+        try:
+            msg = orjson.loads(message)
+
+            op = msg.get('op')
+            if op == 'auth':
+                if msg.get('success'):
+                    ws.send(orjson.dumps({'op': 'subscribe', 'args': ['position', 'order', 'wallet']}).decode('utf-8'))
+                    with self._lock:
+                        self._private_ready = True
+                    self.logger.info("WebSocket private stream authenticated")
+                else:
+                    self.logger.error(f"WebSocket auth failed: {msg.get('ret_msg')}")
+                return
+            if op is not None:
+                return
+
+            topic = msg.get('topic', '')
+            data = msg.get('data')
+
+            if topic.startswith('tickers.'):
+                self._handle_ticker(data)
+            elif topic.startswith('orderbook.'):
+                self._handle_orderbook(data)
+            elif topic == 'order':
+                self._handle_orders(data)
+            elif topic == 'position':
+                self._handle_positions(data)
+            elif topic == 'wallet':
+                self._handle_wallet(data)
+
+        except Exception as e:
+            self.logger.error(f"Error handling WebSocket message: {e}")
+
+    def _handle_ticker(self, data: Dict):
+        """ティッカー（スナップショット/差分）をマージ"""
+        with self._lock:
+            self._ticker_cache.update(data)
+            self._ticker_ts = time.monotonic()
+
+    def _handle_orderbook(self, data: Dict):
+        """最良気配で bid/ask を更新"""
+        with self._lock:
+            if data.get('b') and data['b'][0][1] != '0':
+                self._ticker_cache['bid1Price'] = data['b'][0][0]
+            if data.get('a') and data['a'][0][1] != '0':
+                self._ticker_cache['ask1Price'] = data['a'][0][0]
+
+    def _handle_orders(self, data: List[Dict]):
+        """注文イベントを未約定注文キャッシュに反映"""
+        with self._lock:
+            for order in data:
+                if order.get('symbol') != self.config.symbol:
+                    continue
+                order_id = order['orderId']
+                if order['orderStatus'] in self.OPEN_ORDER_STATUSES:
+                    entry = {
+                        'order_id': order_id,
+                        'order_link_id': order.get('orderLinkId'),
+                        'symbol': order['symbol'],
+                        'side': order['side'],
+                        'price': float(order['price']),
+                        'qty': float(order['qty']),
+                        'filled_qty': float(order.get('cumExecQty') or 0),
+                        'status': order['orderStatus'],
+                        'created_time': order.get('createdTime')
+                    }
+                    if self._orders_cache is None:
+                        # REST取得結果で初期化するときに上書き適用する
+                        self._pending_orders[order_id] = entry
+                    else:
+                        self._orders_cache[order_id] = entry
+                else:
+                    if self._orders_cache is None:
+                        self._pending_orders[order_id] = None
+                    else:
+                        self._orders_cache.pop(order_id, None)
+                    self._order_events.put({
+                        'order_id': order_id,
+                        'side': order['side'],
+                        'price': float(order['price']),
+                        'qty': float(order['qty']),
+                        'status': order['orderStatus'],
+                        'reject_reason': order.get('rejectReason', '')
+                    })
+
+    def _handle_positions(self, data: List[Dict]):
+        """ポジションイベントをキャッシュに反映"""
+        for pos in data:
+            if pos.get('symbol') != self.config.symbol:
+                continue
+            entry_price = pos.get('entryPrice') or pos.get('avgPrice')
+            with self._lock:
+                self._position_cache = {
+                    'symbol': pos['symbol'],
+                    'side': pos.get('side') or 'None',
+                    'size': float(pos['size']) if pos.get('size') else 0.0,
+                    'entry_price': float(entry_price) if entry_price else 0.0,
+                    'unrealized_pnl': float(pos['unrealisedPnl']) if pos.get('unrealisedPnl') else 0.0,
+                    'leverage': float(pos['leverage']) if pos.get('leverage') else self.config.leverage
+                }
+
+    def _handle_wallet(self, data: List[Dict]):
+        """残高イベントをキャッシュに反映"""
+        for account in data:
+            for coin in account.get('coin', []):
+                if coin['coin'] != 'USDT':
+                    continue
+                wallet_balance = float(coin['walletBalance']) if coin['walletBalance'] else 0.0
+                available_balance = float(coin['availableToWithdraw']) if coin.get('availableToWithdraw') else wallet_balance
+                with self._lock:
+                    self._wallet_cache = {
+                        'total': wallet_balance,
+                        'available': available_balance,
+                        'used': wallet_balance - available_balance
+                    }
+
+    def get_ticker(self) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みティッカー（古い場合はNone）"""
+        with self._lock:
+            if not self._public_connected or time.monotonic() - self._ticker_ts > self.TICKER_MAX_AGE:
+                return None
+            t = self._ticker_cache
+            try:
+                return {
+                    'symbol': t['symbol'],
+                    'last_price': float(t['lastPrice']),
+                    'bid': float(t['bid1Price']),
+                    'ask': float(t['ask1Price']),
+                    'volume_24h': float(t['volume24h']),
+                    'price_change_24h': float(t['price24hPcnt']) * 100
+                }
+            except (KeyError, ValueError):
+                return None
+
+    def get_open_orders(self) -> Optional[List[Dict]]:
+        """キャッシュ済み未約定注文（未初期化・切断中はNone）"""
+        with self._lock:
+            if not self._private_ready or self._orders_cache is None:
+                return None
+            return list(self._orders_cache.values())
+
+    def drain_order_events(self) -> Dict[str, Dict]:
+        """
+        受信済みの注文終了イベントをすべて取り出す
+        
+        Returns:
+            注文ID -> 最新のイベント（status, reject_reason, side, price, qty）
+        """
+        events = {}
+        while True:
+            try:
+                event = self._order_events.get_nowait()
+            except queue.Empty:
+                return events
+            events[event['order_id']] = event
+    
+    def get_position(self) -> Optional[Dict]:
+        """キャッシュ済みポジション（未初期化・切断中はNone）"""
+        with self._lock:
+            if not self._private_ready:
+                return None
+            return self._position_cache
+
+    def get_balance(self) -> Optional[Dict[str, Any]]:
+        """キャッシュ済み残高（未初期化・切断中はNone）"""
+        with self._lock:
+            if not self._private_ready:
+                return None
+            return self._wallet_cache
+
+    def seed_open_orders(self, orders: List[Dict]):
+        """
+        REST取得結果で未約定注文キャッシュを初期化
+        
+        REST取得の前後に受信した注文イベントを上書き適用し、取得後に
+        約定・キャンセルされた注文や新規注文の取りこぼしを防ぐ
+        
+        Args:
+            orders: RESTで取得した未約定注文のリスト
+        """
+        with self._lock:
+            if self._private_ready and self._orders_cache is None:
+                cache = {order['order_id']: order for order in orders}
+                for order_id, entry in self._pending_orders.items():
+                    if entry is None:
+                        cache.pop(order_id, None)
+                    else:
+                        cache[order_id] = entry
+                self._pending_orders = {}
+                self._orders_cache = cache
+
+    def seed_position(self, position: Dict):
+        """REST取得結果でポジションキャッシュを初期化"""
+        with self._lock:
+            if self._private_ready and self._position_cache is None:
+                self._position_cache = position
+
+    def seed_balance(self, balance: Dict[str, Any]):
+        """REST取得結果で残高キャッシュを初期化"""
+        with self._lock:
+            if self._private_ready and self._wallet_cache is None:
+                self._wallet_cache = balance
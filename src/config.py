@@ -5,110 +5,192 @@ YAMLファイルと環境変数から設定を読み込む
 
 import os
 import yaml
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
-from typing import Dict, Any
+from typing import Optional
 
+# libyamlがあればCローダーで高速に読み込む
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
+# プロジェクトルートディレクトリ
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+@lru_cache(maxsize=None)
+def _load_env_once():
+    """config/.env を読み込む（プロセス内で1回だけ）"""
+    load_dotenv(PROJECT_ROOT / "config" / ".env")
+
+
+@dataclass(slots=True)
 class Config:
-    """設定クラス"""
+    """
+    設定クラス
+    
+    属性はスロットに格納する（取引中に参照される回数が多いため）。
+    動的設定で grid_count / leverage などを更新するので frozen にはしない。
+    """
+    
+    # パス・API認証情報（認証情報はreprに含めない）
+    project_root: Path
+    api_key: str = field(repr=False)
+    api_secret: str = field(repr=False)
+    
+    # API設定
+    testnet: bool = True
+    api_timeout: float = 5.0  # HTTPリクエストのタイムアウト（秒）
+    
+    # WebSocket設定
+    use_websocket: bool = True
+    
+    # HTTP接続の維持（アイドル中も定期的にリクエストを送る、BOT実行時のみ）
+    http_keepalive: bool = True
+    
+    # 取引設定
+    symbol: str = 'BTCUSDT'
+    leverage: int = 2
+    position_mode: str = 'MergedSingle'
+    
+    # グリッド設定
+    grid_count: int = 20
+    grid_range_percent: float = 0.05
+    min_range_percent: float = 0.02
+    max_range_percent: float = 0.08
+    use_dynamic_range: bool = True
+    atr_multiplier: float = 2.0
+    atr_period: int = 14
+    
+    # 注文設定
+    min_profit_percent: float = 0.003
+    order_offset_percent: float = 0.0001
+    retry_count: int = 3
+    retry_delay: int = 5
+    
+    # リスク管理設定
+    max_position_ratio: float = 0.6
+    daily_loss_limit: float = 0.05
+    stop_loss_percent: float = 0.10
+    max_drawdown: float = 0.15
+    daily_profit_target: float = 0.02
     
-    def __init__(self, config_path: str = None):
+    # 手数料設定
+    maker_fee: float = 0.0002
+    taker_fee: float = 0.0055
+    
+    # ログ設定
+    log_level: str = 'INFO'
+    log_console: bool = True
+    log_file: bool = True
+    log_dir: Optional[Path] = None
+    trade_history: bool = True
+    trade_flush_batch: int = 32
+    trade_flush_interval: float = 1.0
+    log_flush_interval: float = 1.0
+    force_color: bool = False
+    
+    # 実行設定
+    check_interval: int = 60
+    grid_update_interval: int = 3600
+    position_check_interval: int = 30
+    max_filled_history: int = 1000
+    
+    # 通知設定
+    notification_enabled: bool = False
+    notification_email: str = ''
+    notification_webhook: str = ''
+    
+    @classmethod
+    def from_yaml(cls, config_path: str = None) -> 'Config':
         """
-        初期化
+        YAMLファイルと環境変数から設定を生成
         
         Args:
             config_path: 設定ファイルのパス（デフォルト: config/config.yaml）
+            
+        Returns:
+            設定オブジェクト
         """
-        # プロジェクトルートディレクトリを取得
-        self.project_root = Path(__file__).parent.parent
+        project_root = PROJECT_ROOT
         
         # 環境変数を読み込み
-        env_path = self.project_root / "config" / ".env"
-        load_dotenv(env_path)
+        _load_env_once()
         
         # 設定ファイルを読み込み
         if config_path is None:
-            config_path = self.project_root / "config" / "config.yaml"
+            config_path = project_root / "config" / "config.yaml"
         
         with open(config_path, 'r', encoding='utf-8') as f:
-            self._config = yaml.safe_load(f)
+            raw = yaml.load(f, Loader=_YAML_LOADER) or {}
         
         # API認証情報を環境変数から取得
-        self.api_key = os.getenv('BYBIT_API_KEY')
-        self.api_secret = os.getenv('BYBIT_API_SECRET')
+        api_key = os.getenv('BYBIT_API_KEY')
+        api_secret = os.getenv('BYBIT_API_SECRET')
         
-        if not self.api_key or not self.api_secret:
+        if not api_key or not api_secret:
             raise ValueError(
                 "API credentials not found. "
                 "Please set BYBIT_API_KEY and BYBIT_API_SECRET in .env file"
             )
         
-        # 設定を属性として展開
-        self._load_config()
-    
-    def _load_config(self):
-        """設定をクラス属性として読み込む"""
-        
-        # API設定
-        api_config = self._config.get('api', {})
-        self.testnet = api_config.get('testnet', True)
-        
-        # 取引設定
-        trading_config = self._config.get('trading', {})
-        self.symbol = trading_config.get('symbol', 'BTCUSDT')
-        self.leverage = trading_config.get('leverage', 2)
-        self.position_mode = trading_config.get('position_mode', 'MergedSingle')
-        
-        # グリッド設定
-        grid_config = self._config.get('grid', {})
-        self.grid_count = grid_config.get('count', 20)
-        self.grid_range_percent = grid_config.get('range_percent', 0.05)
-        self.min_range_percent = grid_config.get('min_range_percent', 0.02)
-        self.max_range_percent = grid_config.get('max_range_percent', 0.08)
-        self.use_dynamic_range = grid_config.get('use_dynamic_range', True)
-        self.atr_multiplier = grid_config.get('atr_multiplier', 2.0)
-        self.atr_period = grid_config.get('atr_period', 14)
-        
-        # 注文設定
-        order_config = self._config.get('order', {})
-        self.min_profit_percent = order_config.get('min_profit_percent', 0.003)
-        self.order_offset_percent = order_config.get('order_offset_percent', 0.0001)
-        self.retry_count = order_config.get('retry_count', 3)
-        self.retry_delay = order_config.get('retry_delay', 5)
-        
-        # リスク管理設定
-        risk_config = self._config.get('risk', {})
-        self.max_position_ratio = risk_config.get('max_position_ratio', 0.6)
-        self.daily_loss_limit = risk_config.get('daily_loss_limit', 0.05)
-        self.stop_loss_percent = risk_config.get('stop_loss_percent', 0.10)
-        self.max_drawdown = risk_config.get('max_drawdown', 0.15)
-        self.daily_profit_target = risk_config.get('daily_profit_target', 0.02)
-        
-        # 手数料設定
-        fees_config = self._config.get('fees', {})
-        self.maker_fee = fees_config.get('maker', 0.0002)
-        self.taker_fee = fees_config.get('taker', 0.0055)
-        
-        # ログ設定
-        logging_config = self._config.get('logging', {})
-        self.log_level = logging_config.get('level', 'INFO')
-        self.log_console = logging_config.get('console', True)
-        self.log_file = logging_config.get('file', True)
-        self.log_dir = self.project_root / logging_config.get('log_dir', 'logs')
-        self.trade_history = logging_config.get('trade_history', True)
-        
-        # 実行設定
-        execution_config = self._config.get('execution', {})
-        self.check_interval = execution_config.get('check_interval', 60)
-        self.grid_update_interval = execution_config.get('grid_update_interval', 3600)
-        self.position_check_interval = execution_config.get('position_check_interval', 30)
+        api_config = raw.get('api', {})
+        websocket_config = raw.get('websocket', {})
+        trading_config = raw.get('trading', {})
+        grid_config = raw.get('grid', {})
+        order_config = raw.get('order', {})
+        risk_config = raw.get('risk', {})
+        fees_config = raw.get('fees', {})
+        logging_config = raw.get('logging', {})
+        execution_config = raw.get('execution', {})
+        notification_config = raw.get('notification', {})
         
-        # 通知設定
-        notification_config = self._config.get('notification', {})
-        self.notification_enabled = notification_config.get('enabled', False)
-        self.notification_email = notification_config.get('email', '')
-        self.notification_webhook = notification_config.get('webhook_url', '')
+        return cls(
+            project_root=project_root,
+            api_key=api_key,
+            api_secret=api_secret,
+            testnet=api_config.get('testnet', True),
+            api_timeout=api_config.get('timeout', 5.0),
+            use_websocket=websocket_config.get('enabled', True),
+            http_keepalive=execution_config.get('http_keepalive', True),
+            symbol=trading_config.get('symbol', 'BTCUSDT'),
+            leverage=trading_config.get('leverage', 2),
+            position_mode=trading_config.get('position_mode', 'MergedSingle'),
+            grid_count=grid_config.get('count', 20),
+            grid_range_percent=grid_config.get('range_percent', 0.05),
+            min_range_percent=grid_config.get('min_range_percent', 0.02),
+            max_range_percent=grid_config.get('max_range_percent', 0.08),
+            use_dynamic_range=grid_config.get('use_dynamic_range', True),
+            atr_multiplier=grid_config.get('atr_multiplier', 2.0),
+            atr_period=grid_config.get('atr_period', 14),
+            min_profit_percent=order_config.get('min_profit_percent', 0.003),
+            order_offset_percent=order_config.get('order_offset_percent', 0.0001),
+            retry_count=order_config.get('retry_count', 3),
+            retry_delay=order_config.get('retry_delay', 5),
+            max_position_ratio=risk_config.get('max_position_ratio', 0.6),
+            daily_loss_limit=risk_config.get('daily_loss_limit', 0.05),
+            stop_loss_percent=risk_config.get('stop_loss_percent', 0.10),
+            max_drawdown=risk_config.get('max_drawdown', 0.15),
+            daily_profit_target=risk_config.get('daily_profit_target', 0.02),
+            maker_fee=fees_config.get('maker', 0.0002),
+            taker_fee=fees_config.get('taker', 0.0055),
+            log_level=logging_config.get('level', 'INFO'),
+            log_console=logging_config.get('console', True),
+            log_file=logging_config.get('file', True),
+            log_dir=project_root / logging_config.get('log_dir', 'logs'),
+            trade_history=logging_config.get('trade_history', True),
+            trade_flush_batch=logging_config.get('trade_flush_batch', 32),
+            trade_flush_interval=logging_config.get('trade_flush_interval', 1.0),
+            log_flush_interval=logging_config.get('log_flush_interval', 1.0),
+            force_color=logging_config.get('force_color', False),
+            check_interval=execution_config.get('check_interval', 60),
+            grid_update_interval=execution_config.get('grid_update_interval', 3600),
+            position_check_interval=execution_config.get('position_check_interval', 30),
+            max_filled_history=execution_config.get('max_filled_history', 1000),
+            notification_enabled=notification_config.get('enabled', False),
+            notification_email=notification_config.get('email', ''),
+            notification_webhook=notification_config.get('webhook_url', '')
+        )
     
     def get_bybit_endpoint(self) -> str:
         """Bybit APIエンドポイントを取得"""
@@ -177,6 +259,7 @@ Fees:
 
 if __name__ == "__main__":
     # テスト
-    config = Config()
+    config = Config.from_yaml()
     print(config)
+    assert not config.api_secret or config.api_secret not in repr(config), "API secret leaked in repr"
     print(f"Configuration valid: {config.validate()}")
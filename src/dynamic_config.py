@@ -4,69 +4,63 @@
 """
 
 import logging
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
+
+import numpy as np
+
+import kernels
+
+
+@dataclass(frozen=True, slots=True)
+class Tier:
+    """資産額ティアごとの推奨設定"""
+    
+    min_balance: float
+    max_balance: float
+    grid_count: int
+    range_percent: float
+    max_position_ratio: float
+    leverage: int
+    description: str
+    
+    # 返却用設定とティア情報文字列（生成時に1回だけ作成）
+    settings: Mapping[str, Any] = field(init=False, repr=False, compare=False)
+    info_str: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'settings', MappingProxyType({
+            'grid_count': self.grid_count,
+            'range_percent': self.range_percent,
+            'max_position_ratio': self.max_position_ratio,
+            'leverage': self.leverage,
+            'tier_description': self.description
+        }))
+        object.__setattr__(self, 'info_str', (
+            f"\n{'='*60}\n"
+            f"Current Tier: {self.description}\n"
+            f"Balance Range: {self.min_balance}-{self.max_balance} USDT\n"
+            f"Grid Count: {self.grid_count}\n"
+            f"Price Range: ±{self.range_percent*100:.1f}%\n"
+            f"Max Position: {self.max_position_ratio*100:.0f}%\n"
+            f"Leverage: {self.leverage}x\n"
+            f"{'='*60}"
+        ))
 
 
 class DynamicConfigManager:
     """資産額に応じた動的設定管理"""
     
-    # 資産額別の推奨設定
-    BALANCE_TIERS = [
-        {
-            'min_balance': 300,
-            'max_balance': 500,
-            'grid_count': 6,
-            'range_percent': 0.03,
-            'max_position_ratio': 0.85,
-            'leverage': 2,
-            'description': '300-500 USDT: 保守的運用'
-        },
-        {
-            'min_balance': 500,
-            'max_balance': 800,
-            'grid_count': 10,
-            'range_percent': 0.035,
-            'max_position_ratio': 0.75,
-            'leverage': 2,
-            'description': '500-800 USDT: バランス運用'
-        },
-        {
-            'min_balance': 800,
-            'max_balance': 1200,
-            'grid_count': 15,
-            'range_percent': 0.04,
-            'max_position_ratio': 0.70,
-            'leverage': 2,
-            'description': '800-1200 USDT: 標準運用'
-        },
-        {
-            'min_balance': 1200,
-            'max_balance': 2000,
-            'grid_count': 20,
-            'range_percent': 0.045,
-            'max_position_ratio': 0.65,
-            'leverage': 2,
-            'description': '1200-2000 USDT: 積極運用'
-        },
-        {
-            'min_balance': 2000,
-            'max_balance': 5000,
-            'grid_count': 30,
-            'range_percent': 0.05,
-            'max_position_ratio': 0.60,
-            'leverage': 2,
-            'description': '2000-5000 USDT: 高頻度運用'
-        },
-        {
-            'min_balance': 5000,
-            'max_balance': float('inf'),
-            'grid_count': 40,
-            'range_percent': 0.05,
-            'max_position_ratio': 0.55,
-            'leverage': 2,
-            'description': '5000+ USDT: 最大効率運用'
-        }
-    ]
+    # 資産額別の推奨設定（min_balance昇順）
+    BALANCE_TIERS = (
+        Tier(300, 500, 6, 0.03, 0.85, 2, '300-500 USDT: 保守的運用'),
+        Tier(500, 800, 10, 0.035, 0.75, 2, '500-800 USDT: バランス運用'),
+        Tier(800, 1200, 15, 0.04, 0.70, 2, '800-1200 USDT: 標準運用'),
+        Tier(1200, 2000, 20, 0.045, 0.65, 2, '1200-2000 USDT: 積極運用'),
+        Tier(2000, 5000, 30, 0.05, 0.60, 2, '2000-5000 USDT: 高頻度運用'),
+        Tier(5000, float('inf'), 40, 0.05, 0.55, 2, '5000+ USDT: 最大効率運用')
+    )
     
     def __init__(self, logger: logging.Logger):
         """
@@ -79,7 +73,7 @@ class DynamicConfigManager:
         self.current_tier = None
         self.current_balance = 0.0
     
-    def get_optimal_settings(self, balance: float) -> Dict[str, Any]:
+    def get_optimal_settings(self, balance: float) -> Mapping[str, Any]:
         """
         資産額に応じた最適設定を取得
         
@@ -87,7 +81,7 @@ class DynamicConfigManager:
             balance: 現在の資産額（USDT）
             
         Returns:
-            最適設定の辞書
+            最適設定の辞書（ティアごとに共有される読み取り専用マッピング）
         """
         self.current_balance = balance
         
@@ -96,28 +90,21 @@ class DynamicConfigManager:
             self.logger.error(f"Balance too low: {balance:.2f} USDT (minimum: 300 USDT)")
             return None
         
-        # 該当するティアを検索
-        for tier in self.BALANCE_TIERS:
-            if tier['min_balance'] <= balance < tier['max_balance']:
-                self.current_tier = tier
-                break
-        
-        if not self.current_tier:
-            # デフォルト設定（最後のティア）
-            self.current_tier = self.BALANCE_TIERS[-1]
-        
-        self.logger.info(f"Balance tier: {self.current_tier['description']}")
-        self.logger.info(f"Optimal grid count: {self.current_tier['grid_count']}")
-        self.logger.info(f"Price range: ±{self.current_tier['range_percent']*100:.1f}%")
-        self.logger.info(f"Max position ratio: {self.current_tier['max_position_ratio']*100:.0f}%")
-        
-        return {
-            'grid_count': self.current_tier['grid_count'],
-            'range_percent': self.current_tier['range_percent'],
-            'max_position_ratio': self.current_tier['max_position_ratio'],
-            'leverage': self.current_tier['leverage'],
-            'tier_description': self.current_tier['description']
-        }
+        # 該当するティアを二分探索（最後のティアは上限なしなので balance >= 300 なら必ず見つかる）
+        idx = kernels.tier_lookup(float(balance), TIER_THRESHOLDS)
+        assert idx >= 0
+        tier = self.BALANCE_TIERS[idx]
+        
+        # ティアが変わったときだけログ出力
+        if tier is not self.current_tier:
+            self.current_tier = tier
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info("Balance tier: %s", tier.description)
+                self.logger.info("Optimal grid count: %d", tier.grid_count)
+                self.logger.info("Price range: ±%.1f%%", tier.range_percent*100)
+                self.logger.info("Max position ratio: %.0f%%", tier.max_position_ratio*100)
+        
+        return self.current_tier.settings
     
     def calculate_order_size(self, balance: float, current_price: float, settings: Dict[str, Any]) -> float:
         """
@@ -135,19 +122,19 @@ class DynamicConfigManager:
         max_position_ratio = settings['max_position_ratio']
         leverage = settings['leverage']
         
-        # 1グリッドあたりのUSDT額
-        usdt_per_grid = (balance * leverage * max_position_ratio) / grid_count
-        
-        # BTC換算
-        btc_per_grid = usdt_per_grid / current_price
+        # 1グリッドあたりのUSDT額とBTC換算（残高・価格は有効桁数で丸めてキャッシュ）
+        usdt_per_grid, btc_per_grid = kernels.order_size(
+            balance, current_price, grid_count, max_position_ratio, leverage
+        )
         
-        self.logger.debug(f"Order size calculation:")
-        self.logger.debug(f"  Balance: {balance:.2f} USDT")
-        self.logger.debug(f"  Leverage: {leverage}x")
-        self.logger.debug(f"  Max position ratio: {max_position_ratio*100:.0f}%")
-        self.logger.debug(f"  Grid count: {grid_count}")
-        self.logger.debug(f"  USDT per grid: {usdt_per_grid:.2f}")
-        self.logger.debug(f"  BTC per grid: {btc_per_grid:.6f}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Order size calculation:")
+            self.logger.debug("  Balance: %.2f USDT", balance)
+            self.logger.debug("  Leverage: %sx", leverage)
+            self.logger.debug("  Max position ratio: %.0f%%", max_position_ratio*100)
+            self.logger.debug("  Grid count: %d", grid_count)
+            self.logger.debug("  USDT per grid: %.2f", usdt_per_grid)
+            self.logger.debug("  BTC per grid: %.6f", btc_per_grid)
         
         # Bybitの最小注文サイズチェック（0.001 BTC）
         min_order_size = 0.001
@@ -171,8 +158,8 @@ class DynamicConfigManager:
             return True
         
         # 現在のティアの範囲外になった場合
-        if new_balance < self.current_tier['min_balance'] or new_balance >= self.current_tier['max_balance']:
-            self.logger.info(f"Balance changed significantly: {self.current_balance:.2f} → {new_balance:.2f} USDT")
+        if new_balance < self.current_tier.min_balance or new_balance >= self.current_tier.max_balance:
+            self.logger.info("Balance changed significantly: %.2f → %.2f USDT", self.current_balance, new_balance)
             self.logger.info("Rebalancing required")
             return True
         
@@ -188,13 +175,27 @@ class DynamicConfigManager:
         if not self.current_tier:
             return "No tier selected"
         
-        return (
-            f"\n{'='*60}\n"
-            f"Current Tier: {self.current_tier['description']}\n"
-            f"Balance Range: {self.current_tier['min_balance']}-{self.current_tier['max_balance']} USDT\n"
-            f"Grid Count: {self.current_tier['grid_count']}\n"
-            f"Price Range: ±{self.current_tier['range_percent']*100:.1f}%\n"
-            f"Max Position: {self.current_tier['max_position_ratio']*100:.0f}%\n"
-            f"Leverage: {self.current_tier['leverage']}x\n"
-            f"{'='*60}"
-        )
+        return self.current_tier.info_str
+
+
+# ティア検索用の下限残高（BALANCE_TIERSはmin_balance昇順）
+TIER_THRESHOLDS = np.array([tier.min_balance for tier in DynamicConfigManager.BALANCE_TIERS], dtype=np.float64)
+
+
+if __name__ == "__main__":
+    # テスト（境界値を含む残高が想定どおりのティアになり、assertに掛からないことを確認）
+    manager = DynamicConfigManager(logging.getLogger("DynamicConfigTest"))
+    
+    expected = {300: 6, 500: 10, 800: 15, 1_000_000: 40}
+    for tier in DynamicConfigManager.BALANCE_TIERS:
+        expected[tier.min_balance] = tier.grid_count
+        if tier.max_balance != float('inf'):
+            expected[tier.max_balance - 0.01] = tier.grid_count
+    
+    for balance, grid_count in sorted(expected.items()):
+        settings = manager.get_optimal_settings(balance)
+        assert settings['grid_count'] == grid_count, (balance, settings['grid_count'], grid_count)
+        print(f"{balance:>12.2f} USDT -> {settings['tier_description']}")
+    
+    assert manager.get_optimal_settings(299.99) is None
+    print("All tier checks passed")
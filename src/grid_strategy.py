@@ -3,14 +3,49 @@
 グリッドレベルの計算、注文生成、グリッド調整
 """
 
-from typing import List, Dict, Tuple
+from collections import defaultdict
+from typing import Callable, List, Dict, Tuple, Optional
+import logging
 import time
 
+import numpy as np
+
+import kernels
+
+
+def session_link_id_factory(session_id: int) -> Callable[[str, int], str]:
+    """
+    セッションID + タイムスタンプ付きのorderLinkId生成関数を作成
+    
+    Args:
+        session_id: セッションID（BOT起動時のタイムスタンプ）
+        
+    Returns:
+        (方向 'buy'/'sell', インデックス) からorderLinkIdを返す関数
+    """
+    # タイムスタンプを生成（ミリ秒単位で一意性を確保）
+    timestamp = time.time_ns() // 1_000_000
+    
+    # orderLinkIdの共通部分は1回だけ生成
+    prefixes = {
+        'buy': f"grid_buy_{session_id}_{timestamp}_",
+        'sell': f"grid_sell_{session_id}_{timestamp}_"
+    }
+    
+    def link_id(side: str, i: int) -> str:
+        return prefixes[side] + str(i)
+    
+    return link_id
+
 
 class GridStrategy:
     """グリッド戦略クラス"""
     
-    def __init__(self, config, logger, bybit_client, market_analyzer):
+    # 市場サマリーのキャッシュ有効期限（秒）
+    SUMMARY_TTL = 2.0
+    
+    def __init__(self, config, logger, bybit_client, market_analyzer,
+                 link_id_fn: Optional[Callable[[str, int], str]] = None):
         """
         初期化
         
@@ -19,11 +54,14 @@ class GridStrategy:
             logger: ロガーオブジェクト
             bybit_client: Bybitクライアント
             market_analyzer: 市場アナライザー
+            link_id_fn: (方向 'buy'/'sell', インデックス) からorderLinkIdを返す関数
+                （デフォルト: 発注のたびにsession_link_id_factoryで生成）
         """
         self.config = config
         self.logger = logger
         self.client = bybit_client
         self.analyzer = market_analyzer
+        self._link_id_fn = link_id_fn
         
         # グリッド状態
         self.grid_levels = []
@@ -31,16 +69,52 @@ class GridStrategy:
         self.sell_levels = []
         self.grid_range = (0.0, 0.0)
         self.grid_step = 0.0
+        self.range_percent = 0.0
         self.last_update_time = 0
         
+        # グリッド更新判定の価格境界（レンジの10%外側、initialize_gridで更新）
+        self._lo_cutoff = 0.0
+        self._hi_cutoff = 0.0
+        
+        # 市場サマリーのキャッシュ（取得時刻, サマリー）
+        self._summary_cache = (0.0, None)
+        
+        # オフセット適用後の発注価格（_adjusted_levelsでキャッシュ）
+        self._adj_key = None
+        self._adj_buy = np.empty(0)
+        self._adj_sell = np.empty(0)
+        
         # セッションIDを生成（BOT起動時のタイムスタンプ）
         self.session_id = int(time.time())
-        self.logger.info(f"Grid strategy initialized with session ID: {self.session_id}")
+        self.logger.info("Grid strategy initialized with session ID: %d", self.session_id)
+    
+    def _get_summary(self, ttl: float = None) -> Optional[Dict]:
+        """
+        市場サマリーを取得（短時間のTTLでキャッシュ）
+        
+        Args:
+            ttl: キャッシュの有効期限（秒、デフォルト: SUMMARY_TTL）
+            
+        Returns:
+            市場サマリー（取得失敗時はNone）
+        """
+        if ttl is None:
+            ttl = self.SUMMARY_TTL
+        
+        ts, summary = self._summary_cache
+        now = time.monotonic()
+        if summary is not None and now - ts < ttl:
+            return summary
+        
+        summary = self.analyzer.get_market_summary()
+        if summary:
+            self._summary_cache = (now, summary)
+        return summary
     
     def calculate_grid_levels(self, 
                              current_price: float,
                              grid_range: Tuple[float, float],
-                             grid_count: int) -> Tuple[List[float], List[float]]:
+                             grid_count: int) -> Tuple[List[float], List[float], float]:
         """
         グリッドレベルを計算
         
@@ -50,30 +124,19 @@ class GridStrategy:
             grid_count: グリッド数
             
         Returns:
-            (買いレベルのリスト, 売りレベルのリスト)
+            (買いレベルのリスト, 売りレベルのリスト, グリッド間隔)
         """
         lower_price, upper_price = grid_range
         
-        # グリッド間隔を計算（範囲全体をgrid_count個に分割）
-        grid_step = (upper_price - lower_price) / grid_count
-        
-        # 範囲全体を均等に分割してグリッドポイントを生成
-        grid_points = [lower_price + grid_step * i for i in range(grid_count + 1)]
-        
-        # 現在価格に近すぎるポイントを除外するための最小距離（グリッド間隔の10%）
-        min_distance = grid_step * 0.1
-        
-        # 現在価格を基準に買いレベルと売りレベルに分類
-        buy_levels = [price for price in grid_points if price < current_price - min_distance]
-        sell_levels = [price for price in grid_points if price > current_price + min_distance]
-        
-        # 価格順にソート
-        buy_levels.sort(reverse=True)  # 高い順（現在価格に近い順）
-        sell_levels.sort()  # 低い順（現在価格に近い順）
+        # 範囲全体をgrid_count個に分割し、現在価格に近すぎるポイント（グリッド間隔の10%以内）を除いて
+        # 買いレベル（高い順）と売りレベル（低い順）に分類
+        buy, sell, grid_step = kernels.compute_levels(current_price, lower_price, upper_price, grid_count)
+        buy_levels = buy.tolist()
+        sell_levels = sell.tolist()
         
-        self.logger.debug(f"Grid levels calculated: {len(buy_levels)} buy, {len(sell_levels)} sell")
+        self.logger.debug("Grid levels calculated: %d buy, %d sell", len(buy_levels), len(sell_levels))
         
-        return buy_levels, sell_levels
+        return buy_levels, sell_levels, float(grid_step)
     
     def calculate_order_size(self, 
                            total_capital: float,
@@ -90,23 +153,21 @@ class GridStrategy:
         Returns:
             注文サイズ（USDT）
         """
-        # 使用可能資金（総資金の60%）
-        available_capital = total_capital * self.config.max_position_ratio
+        ratio = self.config.max_position_ratio
+        leverage = self.config.leverage
         
-        # レバレッジを考慮
-        leveraged_capital = available_capital * self.config.leverage
-        
-        # グリッド数で分割
-        order_size_usdt = leveraged_capital / grid_count
-        
-        # BTC数量に変換
-        order_size_btc = order_size_usdt / current_price
-        
-        self.logger.debug(
-            f"Order size calculated: {order_size_btc:.4f} BTC "
-            f"({order_size_usdt:.2f} USDT per grid)"
+        # 使用可能資金（総資金×最大ポジション比率）にレバレッジを掛けてグリッド数で分割し、BTC数量に変換
+        # （資金・価格は有効桁数で丸めてキャッシュ）
+        order_size_usdt, order_size_btc = kernels.order_size(
+            total_capital, current_price, grid_count, ratio, leverage
         )
         
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Order size calculated: %.4f BTC (%.2f USDT per grid)",
+                order_size_btc, order_size_usdt
+            )
+        
         return order_size_btc
     
     def initialize_grid(self) -> bool:
@@ -118,7 +179,7 @@ class GridStrategy:
         """
         try:
             # 市場情報を取得
-            summary = self.analyzer.get_market_summary()
+            summary = self._get_summary()
             if not summary:
                 self.logger.error("Failed to get market summary")
                 return False
@@ -127,7 +188,7 @@ class GridStrategy:
             grid_range = summary['grid_range']
             
             # グリッドレベルを計算
-            buy_levels, sell_levels = self.calculate_grid_levels(
+            buy_levels, sell_levels, grid_step = self.calculate_grid_levels(
                 current_price,
                 grid_range,
                 self.config.grid_count
@@ -137,23 +198,47 @@ class GridStrategy:
             self.buy_levels = buy_levels
             self.sell_levels = sell_levels
             self.grid_range = grid_range
-            self.grid_step = (grid_range[1] - grid_range[0]) / self.config.grid_count
+            self.grid_step = grid_step
+            self.range_percent = ((grid_range[1] - grid_range[0]) / (2 * current_price)) * 100
             self.last_update_time = time.time()
             
+            # レンジの10%外に出たら更新するための境界
+            span = grid_range[1] - grid_range[0]
+            self._lo_cutoff = grid_range[0] - 0.1 * span
+            self._hi_cutoff = grid_range[1] + 0.1 * span
+            
             # ログ出力
             self.logger.log_grid_info(
                 current_price=current_price,
                 grid_range=grid_range,
                 grid_count=self.config.grid_count,
-                grid_step=self.grid_step
+                grid_step=self.grid_step,
+                range_percent=self.range_percent
             )
             
             return True
             
         except Exception as e:
-            self.logger.error(f"Error initializing grid: {e}")
+            self.logger.error("Error initializing grid: %s", e)
             return False
     
+    def _adjusted_levels(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        オフセット適用後の発注価格を取得（メイカー注文を確実にするため現在価格から少し離す）
+        
+        グリッドレベルとオフセットが変わらない限り前回の計算結果を再利用する
+        
+        Returns:
+            (買い発注価格の配列, 売り発注価格の配列)
+        """
+        offset = self.config.order_offset_percent
+        key = self._adj_key
+        if key is None or key[0] != offset or key[1] is not self.buy_levels or key[2] is not self.sell_levels:
+            self._adj_buy = np.asarray(self.buy_levels, dtype=np.float64) * (1 - offset)
+            self._adj_sell = np.asarray(self.sell_levels, dtype=np.float64) * (1 + offset)
+            self._adj_key = (offset, self.buy_levels, self.sell_levels)
+        return self._adj_buy, self._adj_sell
+    
     def place_grid_orders(self, order_size: float) -> Dict[str, List]:
         """
         グリッド注文を配置
@@ -169,68 +254,90 @@ class GridStrategy:
             'sell_orders': []
         }
         
-        # 既存の注文をキャンセル
-        self.client.cancel_all_orders()
-        time.sleep(1)
-        
-        # タイムスタンプを生成（ミリ秒単位で一意性を確保）
-        timestamp = int(time.time() * 1000)
-        
-        # 買い注文を配置
-        for i, price in enumerate(self.buy_levels):
-            try:
-                # 価格をわずかにオフセット（メイカー注文を確実にする）
-                adjusted_price = price * (1 - self.config.order_offset_percent)
-                
-                # 一意のorderLinkIdを生成（セッションID + タイムスタンプ + インデックス）
-                order_link_id = f"grid_buy_{self.session_id}_{timestamp}_{i}"
-                
-                order = self.client.place_limit_order(
-                    side="Buy",
-                    qty=order_size,
-                    price=adjusted_price,
-                    order_link_id=order_link_id
-                )
-                
-                if order:
-                    placed_orders['buy_orders'].append(order)
-                
-                time.sleep(0.2)  # API制限対策
-                
-            except Exception as e:
-                self.logger.error(f"Error placing buy order at {price}: {e}")
-        
-        # 売り注文を配置
-        for i, price in enumerate(self.sell_levels):
-            try:
-                # 価格をわずかにオフセット
-                adjusted_price = price * (1 + self.config.order_offset_percent)
-                
-                # 一意のorderLinkIdを生成
-                order_link_id = f"grid_sell_{self.session_id}_{timestamp}_{i}"
-                
-                order = self.client.place_limit_order(
-                    side="Sell",
-                    qty=order_size,
-                    price=adjusted_price,
-                    order_link_id=order_link_id
-                )
-                
-                if order:
-                    placed_orders['sell_orders'].append(order)
-                
-                time.sleep(0.2)
-                
-            except Exception as e:
-                self.logger.error(f"Error placing sell order at {price}: {e}")
+        # オフセット適用済みの発注価格
+        adj_buy, adj_sell = self._adjusted_levels()
+        
+        # 一意のorderLinkIdを生成（デフォルトはセッションID + タイムスタンプ + インデックス）
+        link_id = self._link_id_fn or session_link_id_factory(self.session_id)
+        
+        # 全レベルの注文をまとめる
+        orders = [
+            {'side': 'Buy', 'qty': order_size, 'price': price, 'order_link_id': link_id('buy', i)}
+            for i, price in enumerate(adj_buy.tolist())
+        ]
+        orders += [
+            {'side': 'Sell', 'qty': order_size, 'price': price, 'order_link_id': link_id('sell', i)}
+            for i, price in enumerate(adj_sell.tolist())
+        ]
+        
+        # 既存の注文と突き合わせ、変わらない注文は残して差分だけを入れ替える
+        kept_orders, orders = self._replace_changed_orders(orders)
+        
+        # 一括発注（1リクエストあたり最大20注文）
+        results = self.client.place_limit_orders_batch(orders) if orders else []
+        
+        for order in kept_orders + results:
+            if not order:
+                continue
+            if order['side'] == 'Buy':
+                placed_orders['buy_orders'].append(order)
+            else:
+                placed_orders['sell_orders'].append(order)
         
         self.logger.info(
-            f"Grid orders placed: {len(placed_orders['buy_orders'])} buy, "
-            f"{len(placed_orders['sell_orders'])} sell"
+            "Grid orders placed: %d buy, %d sell (%d kept)",
+            len(placed_orders['buy_orders']), len(placed_orders['sell_orders']), len(kept_orders)
         )
         
         return placed_orders
     
+    def _replace_changed_orders(self, targets: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        既存の未約定注文と目標注文を突き合わせ、不要な注文だけをキャンセル
+        
+        方向・数量・価格（取引所の刻みに丸めた値）が一致する注文はそのまま残す
+        
+        Args:
+            targets: 目標注文のリスト（side, qty, price, order_link_id）
+            
+        Returns:
+            (残した既存注文のリスト, 新たに発注が必要な目標注文のリスト)
+        """
+        existing = self.client.get_open_orders()
+        if not existing:
+            # 未約定注文がない（または取得できない）場合は念のため全キャンセル
+            self.client.cancel_all_orders()
+            return [], targets
+        
+        format_order = self.client.format_order
+        by_key = defaultdict(list)
+        for order in existing:
+            by_key[(order['side'], *format_order(order['qty'], order['price']))].append(order)
+        
+        kept = []
+        to_place = []
+        for target in targets:
+            matches = by_key.get((target['side'], *format_order(target['qty'], target['price'])))
+            if matches:
+                kept.append(matches.pop())
+            else:
+                to_place.append(target)
+        
+        to_cancel = [order['order_id'] for orders in by_key.values() for order in orders]
+        if to_cancel:
+            results = self.client.cancel_orders_batch(to_cancel)
+            cancelled = [order_id for order_id, ok in zip(to_cancel, results) if ok]
+            if to_place and cancelled:
+                # キャンセルした注文が板から消える（証拠金が解放される）のを待つ
+                self.client.wait_orders_closed(cancelled)
+        
+        self.logger.debug(
+            "Grid diff: %d kept, %d cancelled, %d to place",
+            len(kept), len(to_cancel), len(to_place)
+        )
+        
+        return kept, to_place
+    
     def should_update_grid(self, current_price: float) -> bool:
         """
         グリッドを更新すべきかどうかを判定
@@ -246,23 +353,18 @@ class GridStrategy:
         if time_since_update < self.config.grid_update_interval:
             return False
         
-        # 価格がレンジ外に出たかチェック
-        lower, upper = self.grid_range
-        
-        # レンジの10%外に出たら更新
-        range_buffer = (upper - lower) * 0.1
-        
-        if current_price < (lower - range_buffer):
-            self.logger.warning(f"Price {current_price} below grid range, updating grid")
+        # 価格がレンジの10%外に出たかチェック
+        if current_price < self._lo_cutoff:
+            self.logger.warning("Price %s below grid range, updating grid", current_price)
             return True
         
-        if current_price > (upper + range_buffer):
-            self.logger.warning(f"Price {current_price} above grid range, updating grid")
+        if current_price > self._hi_cutoff:
+            self.logger.warning("Price %s above grid range, updating grid", current_price)
             return True
         
         return False
     
-    def update_grid(self, order_size: float) -> bool:
+    def update_grid(self, order_size: float) -> Optional[Dict[str, List]]:
         """
         グリッドを更新
         
@@ -270,23 +372,21 @@ class GridStrategy:
             order_size: 注文サイズ
             
         Returns:
-            成功したかどうか
+            配置された注文のリスト（残した注文を含む、失敗時はNone）
         """
         try:
             self.logger.info("Updating grid...")
             
             # グリッドを再初期化
             if not self.initialize_grid():
-                return False
+                return None
             
             # 注文を再配置
-            self.place_grid_orders(order_size)
-            
-            return True
+            return self.place_grid_orders(order_size)
             
         except Exception as e:
-            self.logger.error(f"Error updating grid: {e}")
-            return False
+            self.logger.error("Error updating grid: %s", e)
+            return None
     
     def calculate_grid_profit(self, fill_price: float, side: str) -> float:
         """
@@ -314,6 +414,7 @@ class GridStrategy:
         return {
             'grid_range': self.grid_range,
             'grid_step': self.grid_step,
+            'range_percent': self.range_percent,
             'buy_levels_count': len(self.buy_levels),
             'sell_levels_count': len(self.sell_levels),
             'last_update_time': self.last_update_time
@@ -327,7 +428,7 @@ if __name__ == "__main__":
     from bybit_client import BybitClient
     from market_analyzer import MarketAnalyzer
     
-    config = Config()
+    config = Config.from_yaml()
     logger = BotLogger(config)
     client = BybitClient(config, logger)
     analyzer = MarketAnalyzer(config, logger, client)
@@ -0,0 +1,166 @@
+"""
+数値計算カーネルモジュール
+ATR・グリッドレベル・ティア検索・注文サイズの計算（Numbaがインストールされていれば JIT コンパイルする）
+"""
+
+import math
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _atr_loop(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> float:
+    """ATR（直近period本のTrue Rangeの平均）をループで計算（JIT用）"""
+    n = high.shape[0]
+    total = 0.0
+    for i in range(n - period, n):
+        prev_close = close[i - 1]
+        tr = high[i] - low[i]
+        hc = abs(high[i] - prev_close)
+        lc = abs(low[i] - prev_close)
+        if hc > tr:
+            tr = hc
+        if lc > tr:
+            tr = lc
+        total += tr
+    return total / period
+
+
+def _atr_numpy(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> float:
+    """ATR（直近period本のTrue Rangeの平均）をNumPyで計算"""
+    h = high[-period:]
+    l = low[-period:]
+    prev_close = close[-period - 1:-1]
+    # 一時配列を2本に抑えて in-place で True Range を求める
+    true_ranges = h - l
+    gap = h - prev_close
+    np.abs(gap, out=gap)
+    np.maximum(true_ranges, gap, out=true_ranges)
+    np.subtract(l, prev_close, out=gap)
+    np.abs(gap, out=gap)
+    np.maximum(true_ranges, gap, out=true_ranges)
+    return float(true_ranges.mean())
+
+
+def _compute_levels_loop(current_price: float, lower: float, upper: float,
+                         grid_count: int) -> Tuple[np.ndarray, np.ndarray, float]:
+    """範囲を等分したグリッドを現在価格の上下に振り分ける（ループ版、JIT用）"""
+    step = (upper - lower) / grid_count
+    min_distance = step * 0.1
+    buy_below = current_price - min_distance
+    sell_above = current_price + min_distance
+
+    n_buy = 0
+    n_sell = 0
+    for i in range(grid_count + 1):
+        price = lower + step * i
+        if price < buy_below:
+            n_buy += 1
+        elif price > sell_above:
+            n_sell += 1
+
+    buy = np.empty(n_buy, dtype=np.float64)
+    sell = np.empty(n_sell, dtype=np.float64)
+    b = n_buy
+    k = 0
+    for i in range(grid_count + 1):
+        price = lower + step * i
+        if price < buy_below:
+            b -= 1
+            buy[b] = price
+        elif price > sell_above:
+            sell[k] = price
+            k += 1
+    return buy, sell, step
+
+
+def _compute_levels_numpy(current_price: float, lower: float, upper: float,
+                          grid_count: int) -> Tuple[np.ndarray, np.ndarray, float]:
+    """範囲を等分したグリッドを現在価格の上下に振り分ける（NumPy版）"""
+    step = (upper - lower) / grid_count
+    min_distance = step * 0.1
+    points = lower + step * np.arange(grid_count + 1, dtype=np.float64)
+    buy = points[points < current_price - min_distance][::-1]
+    sell = points[points > current_price + min_distance]
+    return buy, sell, step
+
+
+def _tier_lookup_loop(balance: float, thresholds: np.ndarray) -> int:
+    """balance以下で最大の閾値のインデックス（該当なしは-1、ループ版、JIT用）"""
+    lo = 0
+    hi = thresholds.shape[0]
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if balance < thresholds[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo - 1
+
+
+def _tier_lookup_numpy(balance: float, thresholds: np.ndarray) -> int:
+    """balance以下で最大の閾値のインデックス（該当なしは-1、NumPy版）"""
+    return int(np.searchsorted(thresholds, balance, side='right')) - 1
+
+
+# 注文サイズのキャッシュキーに使う有効桁数（価格帯によらず相対誤差0.0005%以内）
+ORDER_SIZE_DIGITS = 6
+
+
+def _round_significant(value: float, digits: int) -> float:
+    """有効桁数digitsに丸める（価格・残高の桁数によらず相対的に量子化）"""
+    if value == 0:
+        return 0.0
+    return round(value, digits - 1 - math.floor(math.log10(abs(value))))
+
+
+@lru_cache(maxsize=128)
+def _order_size_cached(balance_q: float, price_q: float, grid_count: int,
+                       ratio: float, leverage: float) -> Tuple[float, float]:
+    """量子化した入力から1グリッドあたりの注文サイズ (USDT, BTC) を計算（結果をキャッシュ）"""
+    usdt_per_grid = (balance_q * leverage * ratio) / grid_count
+    return usdt_per_grid, usdt_per_grid / price_q
+
+
+def order_size(balance: float, price: float, grid_count: int,
+               ratio: float, leverage: float) -> Tuple[float, float]:
+    """
+    1グリッドあたりの注文サイズ (USDT, BTC) を計算
+    
+    残高と価格をORDER_SIZE_DIGITS桁に丸めてキャッシュ済みの結果を再利用する
+    
+    Args:
+        balance: 資金（USDT）
+        price: 現在価格
+        grid_count: グリッド数
+        ratio: 最大ポジション比率
+        leverage: レバレッジ
+        
+    Returns:
+        (1グリッドあたりのUSDT額, 数量)
+    """
+    if price <= 0:
+        raise ValueError(f"Invalid price for order size: {price}")
+    return _order_size_cached(
+        _round_significant(balance, ORDER_SIZE_DIGITS),
+        _round_significant(price, ORDER_SIZE_DIGITS),
+        grid_count, ratio, leverage
+    )
+
+
+if NUMBA_AVAILABLE:
+    atr = njit(cache=True, fastmath=True)(_atr_loop)
+    compute_levels = njit(cache=True)(_compute_levels_loop)
+    tier_lookup = njit(cache=True)(_tier_lookup_loop)
+else:
+    # Numbaがない環境ではPythonループより速いNumPy版を使う
+    atr = _atr_numpy
+    compute_levels = _compute_levels_numpy
+    tier_lookup = _tier_lookup_numpy
@@ -3,17 +3,39 @@
 取引ログ、エラーログ、パフォーマンスログを記録
 """
 
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
-import colorlog
 
 
 class BotLogger:
     """ボット用ロガークラス"""
     
+    # 出力フォーマット
+    _LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    _COLOR_LOG_FORMAT = '%(log_color)s' + _LOG_FORMAT
+    _DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+    
+    # レベル別の表示色
+    _LOG_COLORS = {
+        'DEBUG': 'cyan',
+        'INFO': 'green',
+        'WARNING': 'yellow',
+        'ERROR': 'red',
+        'CRITICAL': 'red,bg_white',
+    }
+    
+    # カラーなしのフォーマッター（インスタンス間で共有）
+    _plain_formatter = logging.Formatter(_LOG_FORMAT, datefmt=_DATE_FORMAT)
+    
     def __init__(self, config, name: str = "GridBot"):
         """
         初期化
@@ -25,7 +47,15 @@ class BotLogger:
         self.config = config
         self.name = name
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(getattr(logging, config.log_level))
+        self._level_no = getattr(logging, config.log_level.upper())
+        self.logger.setLevel(self._level_no)
+        
+        # レベル別の出力メソッドを事前に束縛
+        self._log_debug = self.logger.debug
+        self._log_info = self.logger.info
+        self._log_warning = self.logger.warning
+        self._log_error = self.logger.error
+        self._log_critical = self.logger.critical
         
         # ログディレクトリを作成
         self.log_dir = Path(config.log_dir)
@@ -38,32 +68,68 @@ class BotLogger:
         if config.trade_history:
             self.trade_file = self._get_trade_file()
             self._init_trade_file()
+            
+            # 取引履歴はハンドルを開いたままバッファにためてまとめて書き込む
+            self._trade_fh = open(self.trade_file, 'a', buffering=1 << 16, encoding='utf-8', newline='')
+            self._trade_buf = []
+            self._trade_buf_last_flush = time.monotonic()
+            self._trade_lock = threading.Lock()
+            atexit.register(self.flush_trades)
+            
+            # 行フォーマットと秒単位のタイムスタンプ文字列を使い回す
+            self._trade_row_fmt = "{},{},{},{},{},{},{},{},{},{}\n".format
+            self._trade_ts_second = -1
+            self._trade_ts_str = ""
+        
+        # 取引・ログ出力がない間もバッファを定期的に書き込むスレッド
+        self._flush_stop = threading.Event()
+        self._flush_thread = None
+        intervals = []
+        if config.trade_history:
+            intervals.append(config.trade_flush_interval)
+        if self._memory_handler is not None:
+            intervals.append(config.log_flush_interval)
+        if intervals:
+            self._flush_wait = min(intervals)
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name='bot-log-flush', daemon=True
+            )
+            self._flush_thread.start()
     
     def _setup_handlers(self):
-        """ログハンドラーを設定"""
+        """
+        ログハンドラーを設定
         
-        # フォーマッター
-        log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        date_format = '%Y-%m-%d %H:%M:%S'
+        出力先のハンドラーはQueueListenerのスレッドが持ち、
+        ロガー本体にはキューへ積むだけのQueueHandlerを付ける
+        """
+        handlers = []
+        closing = []
+        self._memory_handler = None
         
-        # コンソールハンドラー（カラー付き）
-        if self.config.log_console:
+        # コンソールハンドラー（端末ならカラー付き）
+        is_tty = sys.stdout.isatty() or self.config.force_color
+        if self.config.log_console and is_tty:
+            import colorlog  # カラー表示するときだけ読み込む
+            
             console_handler = colorlog.StreamHandler(sys.stdout)
             console_handler.setLevel(logging.DEBUG)
             
             color_formatter = colorlog.ColoredFormatter(
-                '%(log_color)s%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                datefmt=date_format,
-                log_colors={
-                    'DEBUG': 'cyan',
-                    'INFO': 'green',
-                    'WARNING': 'yellow',
-                    'ERROR': 'red',
-                    'CRITICAL': 'red,bg_white',
-                }
+                self._COLOR_LOG_FORMAT,
+                datefmt=self._DATE_FORMAT,
+                log_colors=self._LOG_COLORS
             )
             console_handler.setFormatter(color_formatter)
-            self.logger.addHandler(console_handler)
+            handlers.append(console_handler)
+            closing.append(console_handler)
+        elif self.config.log_console:
+            # パイプ・nohup・systemd等ではエスケープシーケンスを付けずWARNING以上のみ出力
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setLevel(max(self._level_no, logging.WARNING))
+            console_handler.setFormatter(self._plain_formatter)
+            handlers.append(console_handler)
+            closing.append(console_handler)
         
         # ファイルハンドラー
         if self.config.log_file:
@@ -71,9 +137,25 @@ class BotLogger:
             file_handler = logging.FileHandler(log_file, encoding='utf-8')
             file_handler.setLevel(logging.DEBUG)
             
-            file_formatter = logging.Formatter(log_format, datefmt=date_format)
-            file_handler.setFormatter(file_formatter)
-            self.logger.addHandler(file_handler)
+            file_handler.setFormatter(self._plain_formatter)
+            
+            # ファイル書き込みはまとめて行う（ERROR以上は即時、それ以外もlog_flush_intervalごとに書き込む）
+            memory_handler = logging.handlers.MemoryHandler(
+                capacity=256, flushLevel=logging.ERROR, target=file_handler
+            )
+            self._memory_handler = memory_handler
+            handlers.append(memory_handler)
+            closing.extend((memory_handler, file_handler))
+        
+        self._log_queue = queue.Queue(-1)
+        self._queue_handler = logging.handlers.QueueHandler(self._log_queue)
+        self.logger.addHandler(self._queue_handler)
+        self._log_handlers = closing
+        self._listener = logging.handlers.QueueListener(
+            self._log_queue, *handlers, respect_handler_level=True
+        )
+        self._listener.start()
+        atexit.register(self.close)
     
     def _get_log_file(self) -> Path:
         """ログファイルパスを取得"""
@@ -86,31 +168,49 @@ class BotLogger:
         return self.log_dir / f"trades_{today}.csv"
     
     def _init_trade_file(self):
-        """取引履歴ファイルを初期化"""
-        if not self.trade_file.exists():
-            header = "timestamp,symbol,side,price,qty,order_id,status,pnl,fee,note\n"
-            with open(self.trade_file, 'w', encoding='utf-8') as f:
-                f.write(header)
+        """取引履歴ファイルを初期化（新規作成したときだけヘッダーを書き込む）"""
+        header = "timestamp,symbol,side,price,qty,order_id,status,pnl,fee,note\n"
+        try:
+            fd = os.open(self.trade_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return
+        try:
+            os.write(fd, header.encode('utf-8'))
+        finally:
+            os.close(fd)
+    
+    def debug(self, message: str, *args):
+        """DEBUGレベルのログ（argsは出力時のみ%書式で展開）"""
+        if self._level_no <= logging.DEBUG:
+            self._log_debug(message, *args)
+    
+    def info(self, message: str, *args):
+        """INFOレベルのログ（argsは出力時のみ%書式で展開）"""
+        if self._level_no <= logging.INFO:
+            self._log_info(message, *args)
     
-    def debug(self, message: str):
-        """DEBUGレベルのログ"""
-        self.logger.debug(message)
+    def warning(self, message: str, *args):
+        """WARNINGレベルのログ（argsは出力時のみ%書式で展開）"""
+        if self._level_no <= logging.WARNING:
+            self._log_warning(message, *args)
     
-    def info(self, message: str):
-        """INFOレベルのログ"""
-        self.logger.info(message)
+    def error(self, message: str, *args):
+        """ERRORレベルのログ（argsは出力時のみ%書式で展開）"""
+        if self._level_no <= logging.ERROR:
+            self._log_error(message, *args)
     
-    def warning(self, message: str):
-        """WARNINGレベルのログ"""
-        self.logger.warning(message)
+    def critical(self, message: str, *args):
+        """CRITICALレベルのログ（argsは出力時のみ%書式で展開）"""
+        self._log_critical(message, *args)
     
-    def error(self, message: str):
-        """ERRORレベルのログ"""
-        self.logger.error(message)
+    def exception(self, message: str, *args):
+        """ERRORレベルのログをトレースバック付きで出力（except節の中で呼ぶ）"""
+        if self._level_no <= logging.ERROR:
+            self._log_error(message, *args, exc_info=True)
     
-    def critical(self, message: str):
-        """CRITICALレベルのログ"""
-        self.logger.critical(message)
+    def isEnabledFor(self, level: int) -> bool:
+        """指定レベルのログが出力されるか（logging.Loggerと同じインターフェース）"""
+        return self._level_no <= level
     
     def log_trade(self, 
                   symbol: str,
@@ -139,13 +239,77 @@ class BotLogger:
         if not self.config.trade_history:
             return
         
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        line = f"{timestamp},{symbol},{side},{price},{qty},{order_id},{status},{pnl},{fee},{note}\n"
+        row = self._trade_row_fmt(
+            self._trade_timestamp(), symbol, side, price, qty, order_id, status, pnl, fee, note
+        )
+        with self._trade_lock:
+            self._trade_buf.append(row)
+            self._maybe_flush_trades()
         
-        with open(self.trade_file, 'a', encoding='utf-8') as f:
-            f.write(line)
+        self.info("Trade: %s %s %s @ %s | PnL: %.4f | Fee: %.4f", side, qty, symbol, price, pnl, fee)
+    
+    def _trade_timestamp(self) -> str:
+        """取引履歴用のタイムスタンプ文字列（同じ秒の間は前回の文字列を再利用）"""
+        second = int(time.time())
+        if second != self._trade_ts_second:
+            self._trade_ts_second = second
+            self._trade_ts_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second))
+        return self._trade_ts_str
+    
+    def _maybe_flush_trades(self):
+        """件数または経過時間が閾値を超えていれば取引履歴を書き込む（_trade_lockを取得して呼ぶ）"""
+        if (len(self._trade_buf) >= self.config.trade_flush_batch
+                or time.monotonic() - self._trade_buf_last_flush > self.config.trade_flush_interval):
+            self._write_trades()
+    
+    def _flush_loop(self):
+        """バッファに残った取引履歴とファイルログを定期的に書き込む"""
+        while not self._flush_stop.wait(self._flush_wait):
+            if self.config.trade_history:
+                with self._trade_lock:
+                    if self._trade_buf:
+                        self._write_trades()
+            if self._memory_handler is not None:
+                self._memory_handler.flush()
+    
+    def flush_trades(self):
+        """バッファ中の取引履歴をファイルに書き込む（終了時にも呼び出す）"""
+        if not self.config.trade_history:
+            return
+        
+        with self._trade_lock:
+            self._write_trades()
+    
+    def _write_trades(self):
+        """バッファ中の取引履歴を書き込んでフラッシュ（_trade_lockを取得して呼ぶ）"""
+        if self._trade_fh.closed:
+            return
         
-        self.info(f"Trade: {side} {qty} {symbol} @ {price} | PnL: {pnl:.4f} | Fee: {fee:.4f}")
+        if self._trade_buf:
+            self._trade_fh.write("".join(self._trade_buf))
+            self._trade_buf.clear()
+        self._trade_fh.flush()
+        self._trade_buf_last_flush = time.monotonic()
+    
+    def close(self):
+        """ログ出力を終了（キューに残ったログと取引履歴をすべて書き出す）"""
+        if self._listener is None:
+            return
+        
+        self._flush_stop.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+        
+        self.logger.removeHandler(self._queue_handler)
+        self._listener.stop()
+        self._listener = None
+        for handler in self._log_handlers:
+            handler.close()
+        
+        if self.config.trade_history:
+            with self._trade_lock:
+                self._write_trades()
+                self._trade_fh.close()
     
     def log_performance(self,
                        total_balance: float,
@@ -165,21 +329,28 @@ class BotLogger:
             win_rate: 勝率
             daily_return: 日次リターン
         """
-        self.info("=" * 60)
-        self.info("Performance Summary")
-        self.info(f"Total Balance: {total_balance:.2f} USDT")
-        self.info(f"Unrealized PnL: {unrealized_pnl:.4f} USDT")
-        self.info(f"Realized PnL: {realized_pnl:.4f} USDT")
-        self.info(f"Total Trades: {total_trades}")
-        self.info(f"Win Rate: {win_rate:.2f}%")
-        self.info(f"Daily Return: {daily_return:.2f}%")
-        self.info("=" * 60)
+        if self._level_no > logging.INFO:
+            return
+        
+        # 1レコードにまとめて出力
+        self._log_info("\n".join((
+            "=" * 60,
+            "Performance Summary",
+            f"Total Balance: {total_balance:.2f} USDT",
+            f"Unrealized PnL: {unrealized_pnl:.4f} USDT",
+            f"Realized PnL: {realized_pnl:.4f} USDT",
+            f"Total Trades: {total_trades}",
+            f"Win Rate: {win_rate:.2f}%",
+            f"Daily Return: {daily_return:.2f}%",
+            "=" * 60
+        )))
     
     def log_grid_info(self,
                      current_price: float,
                      grid_range: tuple,
                      grid_count: int,
-                     grid_step: float):
+                     grid_step: float,
+                     range_percent: float):
         """
         グリッド情報をログに記録
         
@@ -188,16 +359,23 @@ class BotLogger:
             grid_range: グリッド範囲 (lower, upper)
             grid_count: グリッド数
             grid_step: グリッド間隔
+            range_percent: 現在価格からのレンジ幅（±%）
         """
+        if self._level_no > logging.INFO:
+            return
+        
         lower, upper = grid_range
-        self.info("=" * 60)
-        self.info("Grid Configuration")
-        self.info(f"Current Price: {current_price:.2f}")
-        self.info(f"Grid Range: {lower:.2f} - {upper:.2f}")
-        self.info(f"Grid Count: {grid_count}")
-        self.info(f"Grid Step: {grid_step:.2f}")
-        self.info(f"Range: ±{((upper - lower) / (2 * current_price)) * 100:.2f}%")
-        self.info("=" * 60)
+        # 1レコードにまとめて出力
+        self._log_info("\n".join((
+            "=" * 60,
+            "Grid Configuration",
+            f"Current Price: {current_price:.2f}",
+            f"Grid Range: {lower:.2f} - {upper:.2f}",
+            f"Grid Count: {grid_count}",
+            f"Grid Step: {grid_step:.2f}",
+            f"Range: ±{range_percent:.2f}%",
+            "=" * 60
+        )))
     
     def log_risk_alert(self, alert_type: str, message: str):
         """
@@ -207,7 +385,7 @@ class BotLogger:
             alert_type: アラートタイプ
             message: メッセージ
         """
-        self.warning(f"RISK ALERT [{alert_type}]: {message}")
+        self.warning("RISK ALERT [%s]: %s", alert_type, message)
     
     def log_error_with_context(self, error: Exception, context: str):
         """
@@ -224,7 +402,7 @@ if __name__ == "__main__":
     # テスト
     from config import Config
     
-    config = Config()
+    config = Config.from_yaml()
     logger = BotLogger(config)
     
     logger.debug("This is a debug message")
@@ -32,7 +32,7 @@ class GridTradingBot:
             config_path: 設定ファイルのパス
         """
         # 設定読み込み
-        self.config = Config(config_path)
+        self.config = Config.from_yaml(config_path)
         
         # ロガー初期化
         self.logger = BotLogger(self.config)
@@ -53,7 +53,7 @@ class GridTradingBot:
         self.running = False
         self.order_size = 0.0
         self.last_balance = 0.0
-        self.last_position_check = 0
+        self.last_position_check = float('-inf')  # time.monotonic()基準（初回は必ずチェック）
         
         # シグナルハンドラー設定
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -88,7 +88,6 @@ class GridTradingBot:
             if self.client.cancel_all_orders():
                 self.logger.info("既存の注文をキャンセルしました")
                 # キャンセル後、残高が更新されるまで少し待機
-                import time
                 time.sleep(2)
             else:
                 self.logger.warning("注文のキャンセルに失敗しました（注文がない可能性があります）")
@@ -167,8 +166,8 @@ class GridTradingBot:
             
             return True
             
-        except Exception as e:
-            self.logger.error(f"Error during initialization: {e}")
+        except Exception:
+            self.logger.exception("Error during initialization")
             return False
     
     def main_loop(self):
@@ -176,16 +175,42 @@ class GridTradingBot:
         self.running = True
         loop_count = 0
         
+        # ループ中に変わらない設定値・モジュールはローカルに束縛
+        check_interval = self.config.check_interval
+        position_check_interval = self.config.position_check_interval
+        logger = self.logger
+        client = self.client
+        analyzer = self.analyzer
+        strategy = self.strategy
+        risk_manager = self.risk_manager
+        position_manager = self.position_manager
+        
+        # 各イテレーションの予定開始時刻（処理時間に関係なく一定周期で回す）
+        deadline = time.monotonic()
+        
         while self.running:
             try:
                 loop_count += 1
-                self.logger.debug(f"Main loop iteration: {loop_count}")
+                logger.debug("Main loop iteration: %d", loop_count)
+                
+                # 前回イテレーションの市場データキャッシュを破棄
+                analyzer.clear_cache()
                 
-                # 1. 残高取得
-                balance = self.client.get_balance()
+                # 1. 残高・価格（・ポジション）を並列取得
+                position_due = deadline - self.last_position_check > position_check_interval
+                calls = {
+                    'balance': client.get_balance,
+                    'ticker': client.get_ticker
+                }
+                if position_due:
+                    calls['position'] = client.get_position
+                snapshot = client.fetch_concurrently(**calls)
+                
+                balance = snapshot['balance']
                 if not balance:
-                    self.logger.error("Failed to get balance")
+                    logger.error("Failed to get balance")
                     time.sleep(60)
+                    deadline = time.monotonic()
                     continue
                 
                 current_balance = balance['total']
@@ -193,9 +218,9 @@ class GridTradingBot:
                 
                 # 1.5. 資産額に応じた再調整チェック
                 if self.dynamic_config.should_rebalance(available_balance):
-                    self.logger.info("\n" + "="*60)
-                    self.logger.info("Balance tier changed - Rebalancing configuration...")
-                    self.logger.info("="*60)
+                    logger.info("\n" + "="*60)
+                    logger.info("Balance tier changed - Rebalancing configuration...")
+                    logger.info("="*60)
                     
                     # 新しい最適設定を取得
                     optimal_settings = self.dynamic_config.get_optimal_settings(available_balance)
@@ -206,74 +231,82 @@ class GridTradingBot:
                         self.config.max_position_ratio = optimal_settings['max_position_ratio']
                         self.config.leverage = optimal_settings['leverage']
                         
-                        self.logger.info(self.dynamic_config.get_tier_info())
+                        logger.info(self.dynamic_config.get_tier_info())
                         self.last_balance = available_balance
                         
                         # グリッドを再初期化
-                        self.logger.info("グリッドを再初期化します...")
-                        current_price = self.analyzer.get_current_price()
+                        logger.info("グリッドを再初期化します...")
+                        current_price = analyzer.get_current_price()
                         if current_price:
-                            self.order_size = self.strategy.calculate_order_size(
+                            self.order_size = strategy.calculate_order_size(
                                 available_balance,
                                 current_price,
                                 self.config.grid_count
                             )
-                            self.position_manager.rebalance_grid(self.order_size)
+                            position_manager.rebalance_grid(self.order_size)
                 
                 # 2. リスクチェック
-                should_stop, reason = self.risk_manager.should_stop_trading(current_balance)
+                should_stop, reason = risk_manager.should_stop_trading(current_balance)
                 if should_stop:
-                    self.logger.critical(f"Trading stopped: {reason}")
+                    logger.critical(f"Trading stopped: {reason}")
                     self.emergency_shutdown()
                     break
                 
                 # 3. 現在価格取得
-                current_price = self.analyzer.get_current_price()
+                ticker = snapshot['ticker']
+                current_price = ticker['last_price'] if ticker else None
                 if not current_price:
-                    self.logger.error("Failed to get current price")
+                    logger.error("Failed to get current price")
                     time.sleep(60)
+                    deadline = time.monotonic()
                     continue
                 
                 # 4. グリッド更新チェック
-                if self.strategy.should_update_grid(current_price):
-                    self.logger.info("Grid update required")
-                    self.position_manager.rebalance_grid(self.order_size)
+                if strategy.should_update_grid(current_price):
+                    logger.info("Grid update required")
+                    position_manager.rebalance_grid(self.order_size)
                 
                 # 5. 注文追跡と約定処理
-                filled_orders = self.position_manager.track_orders()
+                filled_orders = position_manager.track_orders()
                 
                 if filled_orders['buy_filled'] or filled_orders['sell_filled']:
-                    self.logger.info(
+                    logger.info(
                         f"Orders filled: {len(filled_orders['buy_filled'])} buy, "
                         f"{len(filled_orders['sell_filled'])} sell"
                     )
                 
                 # 6. ポジション情報更新（定期的に）
-                if time.time() - self.last_position_check > self.config.position_check_interval:
-                    self.position_manager.update_position_info()
-                    self.last_position_check = time.time()
+                if position_due:
+                    position_manager.update_position_info(snapshot['position'])
+                    self.last_position_check = deadline
                 
                 # 7. パフォーマンスログ（10分ごと）
                 if loop_count % 10 == 0:
                     self.log_performance(current_balance)
                 
                 # 8. 日次利益目標チェック
-                if self.risk_manager.check_daily_profit_target(current_balance):
-                    self.logger.info("Daily profit target reached, reducing risk...")
+                if risk_manager.check_daily_profit_target(current_balance):
+                    logger.info("Daily profit target reached, reducing risk...")
                     # 新規注文を停止（既存注文は継続）
                     # 実装は省略（オプション機能）
                 
-                # 9. 待機
-                time.sleep(self.config.check_interval)
+                # 9. 次の予定時刻まで待機（遅れている場合は待たずに基準をリセット）
+                deadline += check_interval
+                sleep_for = deadline - time.monotonic()
+                if sleep_for > 0:
+                    time.sleep(sleep_for)
+                else:
+                    deadline = time.monotonic()
                 
             except KeyboardInterrupt:
-                self.logger.warning("Keyboard interrupt received")
+                logger.warning("Keyboard interrupt received")
                 break
-            except Exception as e:
-                self.logger.error(f"Error in main loop: {e}")
+            except Exception:
+                logger.exception("Error in main loop")
                 time.sleep(300)  # エラー時は5分待機
+                deadline = time.monotonic()
         
-        self.logger.info("Main loop ended")
+        logger.info("Main loop ended")
     
     def log_performance(self, current_balance: float):
         """
@@ -303,11 +336,11 @@ class GridTradingBot:
                 daily_return=metrics['daily_return']
             )
             
-            self.logger.info(f"Active Orders: {pos_stats['active_orders']}")
-            self.logger.info(f"Filled Orders: {pos_stats['filled_orders']}")
+            self.logger.info("Active Orders: %d", pos_stats['active_orders'])
+            self.logger.info("Filled Orders: %d", pos_stats['filled_orders'])
             
-        except Exception as e:
-            self.logger.error(f"Error logging performance: {e}")
+        except Exception:
+            self.logger.exception("Error logging performance")
     
     def emergency_shutdown(self):
         """緊急停止処理"""
@@ -317,6 +350,7 @@ class GridTradingBot:
             # 全注文をキャンセル
             self.client.cancel_all_orders()
             self.logger.info("All orders cancelled")
+            self.logger.flush_trades()
             
             # ポジションを決済（オプション）
             # position = self.client.get_position()
@@ -331,8 +365,8 @@ class GridTradingBot:
             
             self.logger.critical("Emergency shutdown completed")
             
-        except Exception as e:
-            self.logger.error(f"Error during emergency shutdown: {e}")
+        except Exception:
+            self.logger.exception("Error during emergency shutdown")
     
     def run(self):
         """BOTを実行"""
@@ -342,6 +376,10 @@ class GridTradingBot:
                 self.logger.error("Initialization failed, exiting...")
                 return
             
+            # アイドル中もHTTP接続を維持
+            if self.config.http_keepalive:
+                self.client.start_keepalive()
+            
             # メインループ開始
             self.logger.info("Starting main loop...")
             self.main_loop()
@@ -349,14 +387,16 @@ class GridTradingBot:
             # 正常終了処理
             self.logger.info("Bot stopped normally")
             
-        except Exception as e:
-            self.logger.critical(f"Fatal error: {e}")
+        except Exception:
+            self.logger.exception("Fatal error")
         finally:
             # クリーンアップ
             self.logger.info("Cleaning up...")
             balance = self.client.get_balance()
             if balance:
                 self.log_performance(balance['total'])
+            self.client.close()
+            self.logger.close()
 
 
 def main():
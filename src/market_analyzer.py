@@ -3,13 +3,19 @@
 ATR計算、ボラティリティ分析、レンジ相場判定など
 """
 
+import time
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from typing import Any, Callable, List, Dict, Tuple, Optional
+
+import kernels
 
 
 class MarketAnalyzer:
     """市場データアナライザー"""
     
+    # ローソク足の時間足（1時間足）
+    KLINE_INTERVAL = "60"
+    
     def __init__(self, config, logger, bybit_client):
         """
         初期化
@@ -22,6 +28,64 @@ class MarketAnalyzer:
         self.config = config
         self.logger = logger
         self.client = bybit_client
+        
+        # 1ループ内の重複リクエストを防ぐ短期キャッシュ {key: (取得時刻, 値)}
+        self._cache: Dict[tuple, Tuple[float, Any]] = {}
+        self._cache_ttl = config.check_interval / 2
+        
+        # ATR・ボラティリティ・レンジ判定で共有するローソク足の本数
+        self._kline_limit = max(config.atr_period + 1, 24)
+    
+    def _cached(self, key: tuple, ttl: float, fn: Callable[[], Any]) -> Any:
+        """
+        有効期限内ならキャッシュ値を返し、なければfnを呼んで保存（Noneは保存しない）
+        
+        Args:
+            key: キャッシュキー
+            ttl: 有効期限（秒）
+            fn: 値を取得する関数
+            
+        Returns:
+            取得した値
+        """
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry is not None and now - entry[0] < ttl:
+            return entry[1]
+        
+        value = fn()
+        if value is not None:
+            self._cache[key] = (now, value)
+        return value
+    
+    def clear_cache(self):
+        """キャッシュを破棄（メインループの各イテレーション開始時に呼ぶ）"""
+        self._cache.clear()
+    
+    def _ticker(self) -> Optional[Dict]:
+        """ティッカーを取得（キャッシュ経由）"""
+        return self._cached(('ticker',), self._cache_ttl, self.client.get_ticker)
+    
+    def _klines(self, limit: int) -> Optional[np.ndarray]:
+        """
+        直近limit本のローソク足を取得（キャッシュ経由）
+        
+        呼び出し元ごとに本数が違っても、共有の本数でまとめて1回だけ取得して末尾を切り出す
+        
+        Args:
+            limit: 必要な本数
+            
+        Returns:
+            ローソク足の構造化配列（古い順）
+        """
+        fetch_limit = max(limit, self._kline_limit)
+        klines = self._cached(
+            ('klines', self.KLINE_INTERVAL, fetch_limit), self._cache_ttl,
+            lambda: self.client.get_klines(interval=self.KLINE_INTERVAL, limit=fetch_limit)
+        )
+        if klines is None:
+            return None
+        return klines[-limit:]
     
     def get_current_price(self) -> Optional[float]:
         """
@@ -30,7 +94,7 @@ class MarketAnalyzer:
         Returns:
             現在価格
         """
-        ticker = self.client.get_ticker()
+        ticker = self._ticker()
         if ticker:
             return ticker['last_price']
         return None
@@ -49,36 +113,23 @@ class MarketAnalyzer:
             period = self.config.atr_period
         
         # ローソク足データを取得（期間+1本）
-        klines = self.client.get_klines(interval="60", limit=period + 1)
-        
-        if not klines or len(klines) < period + 1:
+        return self._atr_from(self._klines(period + 1), period)
+    
+    def _atr_from(self, klines: Optional[np.ndarray], period: int) -> Optional[float]:
+        """取得済みのローソク足からATRを計算"""
+        if klines is None or len(klines) < period + 1:
             self.logger.error("Insufficient kline data for ATR calculation")
             return None
         
         try:
-            true_ranges = []
-            
-            for i in range(1, len(klines)):
-                high = klines[i]['high']
-                low = klines[i]['low']
-                prev_close = klines[i-1]['close']
-                
-                # True Range = max(high-low, |high-prev_close|, |low-prev_close|)
-                tr = max(
-                    high - low,
-                    abs(high - prev_close),
-                    abs(low - prev_close)
-                )
-                true_ranges.append(tr)
-            
-            # ATR = 移動平均
-            atr = np.mean(true_ranges[-period:])
+            # ATR = True Range（max(high-low, |high-prev_close|, |low-prev_close|)）の移動平均
+            atr = float(kernels.atr(klines['high'], klines['low'], klines['close'], period))
             
-            self.logger.debug(f"ATR({period}): {atr:.2f}")
+            self.logger.debug("ATR(%d): %.2f", period, atr)
             return atr
             
-        except Exception as e:
-            self.logger.error(f"Error calculating ATR: {e}")
+        except Exception:
+            self.logger.exception("Error calculating ATR")
             return None
     
     def calculate_volatility(self, period: int = 24) -> Optional[float]:
@@ -91,27 +142,27 @@ class MarketAnalyzer:
         Returns:
             ボラティリティ（%）
         """
-        klines = self.client.get_klines(interval="60", limit=period)
-        
-        if not klines or len(klines) < period:
+        return self._volatility_from(self._klines(period), period)
+    
+    def _volatility_from(self, klines: Optional[np.ndarray], period: int) -> Optional[float]:
+        """取得済みのローソク足（直近period本）からボラティリティを計算"""
+        if klines is None or len(klines) < period:
             self.logger.error("Insufficient kline data for volatility calculation")
             return None
         
         try:
             # 終値の変化率を計算
-            returns = []
-            for i in range(1, len(klines)):
-                ret = (klines[i]['close'] - klines[i-1]['close']) / klines[i-1]['close']
-                returns.append(ret)
+            closes = klines['close'][-period:]
+            returns = np.diff(closes) / closes[:-1]
             
             # 標準偏差を計算
-            volatility = np.std(returns) * 100  # パーセント表示
+            volatility = float(returns.std()) * 100  # パーセント表示
             
-            self.logger.debug(f"Volatility({period}h): {volatility:.2f}%")
+            self.logger.debug("Volatility(%dh): %.2f%%", period, volatility)
             return volatility
             
-        except Exception as e:
-            self.logger.error(f"Error calculating volatility: {e}")
+        except Exception:
+            self.logger.exception("Error calculating volatility")
             return None
     
     def is_range_market(self, threshold: float = 0.7) -> bool:
@@ -125,23 +176,24 @@ class MarketAnalyzer:
             レンジ相場ならTrue
         """
         # 過去24時間のローソク足を取得
-        klines = self.client.get_klines(interval="60", limit=24)
-        
-        if not klines or len(klines) < 24:
+        return self._range_market_from(self._klines(24), threshold)
+    
+    def _range_market_from(self, klines: Optional[np.ndarray], threshold: float) -> bool:
+        """取得済みのローソク足（直近24本）からレンジ相場かどうかを判定"""
+        if klines is None or len(klines) < 24:
             self.logger.warning("Insufficient data for range market detection")
             return True  # デフォルトはレンジ相場として扱う
         
         try:
-            # 高値と安値の範囲を計算
-            highs = [k['high'] for k in klines]
-            lows = [k['low'] for k in klines]
+            klines = klines[-24:]
             
-            max_high = max(highs)
-            min_low = min(lows)
+            # 高値と安値の範囲を計算
+            max_high = float(klines['high'].max())
+            min_low = float(klines['low'].min())
             price_range = max_high - min_low
             
             # 現在価格
-            current_price = klines[-1]['close']
+            current_price = float(klines['close'][-1])
             
             # レンジの中心からの乖離率
             range_center = (max_high + min_low) / 2
@@ -152,29 +204,31 @@ class MarketAnalyzer:
             is_range = deviation < threshold
             
             self.logger.debug(
-                f"Range market check: deviation={deviation:.2f}, "
-                f"threshold={threshold}, is_range={is_range}"
+                "Range market check: deviation=%.2f, threshold=%s, is_range=%s",
+                deviation, threshold, is_range
             )
             
             return is_range
             
-        except Exception as e:
-            self.logger.error(f"Error in range market detection: {e}")
+        except Exception:
+            self.logger.exception("Error in range market detection")
             return True
     
-    def get_optimal_grid_range(self, current_price: float) -> Tuple[float, float]:
+    def get_optimal_grid_range(self, current_price: float, atr: float = None) -> Tuple[float, float]:
         """
         最適なグリッド範囲を計算
         
         Args:
             current_price: 現在価格
+            atr: 計算済みのATR（省略時はここで計算）
             
         Returns:
             (下限価格, 上限価格)
         """
         if self.config.use_dynamic_range:
             # ATRベースの動的範囲
-            atr = self.calculate_atr()
+            if atr is None:
+                atr = self.calculate_atr()
             
             if atr:
                 # ATR × 倍数を範囲とする
@@ -187,7 +241,7 @@ class MarketAnalyzer:
                     min(range_percent, self.config.max_range_percent)
                 )
                 
-                self.logger.info(f"Dynamic range calculated: ±{range_percent * 100:.2f}%")
+                self.logger.info("Dynamic range calculated: ±%.2f%%", range_percent * 100)
             else:
                 # ATR取得失敗時はデフォルト値
                 range_percent = self.config.grid_range_percent
@@ -201,6 +255,29 @@ class MarketAnalyzer:
         
         return (lower_price, upper_price)
     
+    def compute_market_features(self, current_price: float) -> Dict:
+        """
+        ATR・ボラティリティ・レンジ判定・グリッド範囲をまとめて計算
+        
+        ローソク足は1回だけ取得し、各指標はその配列から計算する
+        
+        Args:
+            current_price: 現在価格
+            
+        Returns:
+            {atr, volatility, is_range_market, grid_range, current_price}
+        """
+        klines = self._klines(self._kline_limit)
+        atr = self._atr_from(klines, self.config.atr_period)
+        
+        return {
+            'atr': atr,
+            'volatility': self._volatility_from(klines, 24),
+            'is_range_market': self._range_market_from(klines, 0.7),
+            'grid_range': self.get_optimal_grid_range(current_price, atr=atr),
+            'current_price': current_price
+        }
+    
     def get_market_summary(self) -> Dict:
         """
         市場サマリーを取得
@@ -208,16 +285,14 @@ class MarketAnalyzer:
         Returns:
             市場サマリー情報
         """
-        ticker = self.client.get_ticker()
+        ticker = self._ticker()
         
         if not ticker:
             return None
         
         current_price = ticker['last_price']
-        atr = self.calculate_atr()
-        volatility = self.calculate_volatility()
-        is_range = self.is_range_market()
-        grid_range = self.get_optimal_grid_range(current_price)
+        features = self.compute_market_features(current_price)
+        grid_range = features['grid_range']
         
         summary = {
             'current_price': current_price,
@@ -225,9 +300,9 @@ class MarketAnalyzer:
             'ask': ticker['ask'],
             'volume_24h': ticker['volume_24h'],
             'price_change_24h': ticker['price_change_24h'],
-            'atr': atr,
-            'volatility': volatility,
-            'is_range_market': is_range,
+            'atr': features['atr'],
+            'volatility': features['volatility'],
+            'is_range_market': features['is_range_market'],
             'grid_range': grid_range,
             'range_percent': ((grid_range[1] - grid_range[0]) / (2 * current_price)) * 100
         }
@@ -241,7 +316,7 @@ if __name__ == "__main__":
     from logger import BotLogger
     from bybit_client import BybitClient
     
-    config = Config()
+    config = Config.from_yaml()
     logger = BotLogger(config)
     client = BybitClient(config, logger)
     analyzer = MarketAnalyzer(config, logger, client)
@@ -3,14 +3,32 @@
 注文追跡、約定処理、グリッドリバランス
 """
 
-import time
-from typing import Dict, List, Optional
-from collections import defaultdict
+from typing import Deque, Dict, List, Optional
+from collections import deque
+from fractions import Fraction
+
+import numpy as np
 
 
 class PositionManager:
     """ポジション管理クラス"""
     
+    # 毎サイクル参照する属性をスロットに固定（インスタンス辞書を持たない）
+    __slots__ = (
+        'config', 'logger', 'client', 'strategy', 'risk_manager',
+        '_fee', '_fee_num', '_fee_den',
+        'active_orders', 'filled_orders', 'filled_by_id', 'counter_to_parent', 'filled_count',
+        '_cmd_q',
+        'current_position', 'position_entry_price', 'position_size'
+    )
+    
+    # 状態変更コマンドの種別
+    CMD_ORDER_UPDATE = 'order_update'  # (order_id, status, reject_reason)
+    CMD_OPEN_ORDERS = 'open_orders'    # (未約定注文のリスト,)
+    
+    # コマンドキューの最大長
+    COMMAND_QUEUE_SIZE = 4096
+    
     def __init__(self, config, logger, bybit_client, grid_strategy, risk_manager):
         """
         初期化
@@ -28,19 +46,44 @@ class PositionManager:
         self.strategy = grid_strategy
         self.risk_manager = risk_manager
         
+        # 手数料率（約定ごとに参照するため事前に取り出す）
+        self._fee = float(config.maker_fee)
+        
+        # 手数料率を整数の分数で保持（損益を整数で計算するため）
+        maker_fee = Fraction(str(config.maker_fee))
+        self._fee_num = maker_fee.numerator
+        self._fee_den = maker_fee.denominator
+        
         # 注文追跡
         self.active_orders = {}  # order_id -> order_info
-        self.filled_orders = []
-        self.order_pairs = defaultdict(list)  # 対になる注文を追跡
+        self.filled_orders: Deque[Dict] = deque(maxlen=config.max_filled_history)
+        self.filled_by_id: Dict[str, Dict] = {}  # order_id -> 約定した注文（filled_ordersと同じ範囲）
+        self.counter_to_parent: Dict[str, str] = {}  # 対向注文ID -> 元の約定注文ID
+        self.filled_count = 0
+        
+        # 状態変更コマンドのキュー（run_onceで1つずつ適用する）
+        self._cmd_q: Deque[tuple] = deque(maxlen=self.COMMAND_QUEUE_SIZE)
         
         # ポジション情報
         self.current_position = None
         self.position_entry_price = 0.0
         self.position_size = 0.0
     
-    def track_orders(self) -> Dict[str, List]:
+    def submit(self, kind: str, *args):
         """
-        注文を追跡し、約定を確認
+        状態変更コマンドをキューに積む（適用はrun_onceでまとめて行う）
+        
+        Args:
+            kind: コマンド種別（CMD_*）
+            args: コマンドの引数
+        """
+        self._cmd_q.append((kind, *args))
+    
+    def run_once(self) -> Dict[str, List]:
+        """
+        キューに積まれたコマンドを順に適用
+        
+        active_orders等の注文状態はここ（とrebalance_grid）でのみ変更する
         
         Returns:
             約定した注文のリスト
@@ -50,6 +93,32 @@ class PositionManager:
             'sell_filled': []
         }
         
+        while self._cmd_q:
+            match self._cmd_q.popleft():
+                case (self.CMD_ORDER_UPDATE, order_id, status, reject_reason):
+                    self._apply_order_update(order_id, status, reject_reason, filled_orders)
+                case (self.CMD_OPEN_ORDERS, open_orders):
+                    # 現在の未約定注文を更新
+                    for order in open_orders:
+                        if order['order_id'] not in self.active_orders:
+                            self.active_orders[order['order_id']] = order
+                case command:
+                    self.logger.warning("Unknown position command: %s", command[0])
+        
+        # 約定した注文の対向注文はまとめて一括発注する
+        fills = filled_orders['buy_filled'] + filled_orders['sell_filled']
+        if fills:
+            self.place_counter_orders(fills)
+        
+        return filled_orders
+    
+    def track_orders(self) -> Dict[str, List]:
+        """
+        注文を追跡し、約定を確認
+        
+        Returns:
+            約定した注文のリスト
+        """
         try:
             # 未約定注文を取得
             open_orders = self.client.get_open_orders()
@@ -58,53 +127,79 @@ class PositionManager:
             open_order_ids = {order['order_id'] for order in open_orders}
             
             # 以前アクティブだった注文で、今は存在しない注文を確認
-            for order_id, order_info in list(self.active_orders.items()):
-                if order_id not in open_order_ids:
-                    # 注文履歴から実際のステータスを確認
-                    order_history = self.client.get_order_history(limit=100)
-                    order_status = None
-                    reject_reason = ''
-                    
-                    for hist_order in order_history:
-                        if hist_order['order_id'] == order_id:
-                            order_status = hist_order['status']
-                            reject_reason = hist_order.get('reject_reason', '')
-                            break
-                    
-                    # Filledステータスの場合のみ約定処理
-                    if order_status == 'Filled':
-                        self.logger.info(f"Order filled: {order_info['side']} @ {order_info['price']:.2f}")
-                        
-                        # 約定処理
-                        self.handle_filled_order(order_info)
-                        
-                        # リストに追加
-                        if order_info['side'] == 'Buy':
-                            filled_orders['buy_filled'].append(order_info)
-                        else:
-                            filled_orders['sell_filled'].append(order_info)
-                    elif order_status == 'Cancelled':
-                        reason_msg = f" (Reason: {reject_reason})" if reject_reason else ""
-                        self.logger.warning(f"Order cancelled: {order_info['side']} @ {order_info['price']:.2f}{reason_msg}")
-                    elif order_status == 'Rejected':
-                        reason_msg = f" (Reason: {reject_reason})" if reject_reason else ""
-                        self.logger.warning(f"Order rejected: {order_info['side']} @ {order_info['price']:.2f}{reason_msg}")
-                    else:
-                        self.logger.debug(f"Order removed (status: {order_status}): {order_info['side']} @ {order_info['price']:.2f}")
-                    
-                    # アクティブリストから削除
-                    del self.active_orders[order_id]
+            missing_ids = [order_id for order_id in self.active_orders if order_id not in open_order_ids]
+            
+            # ステータスはWebSocketの注文イベントを優先し、
+            # イベントがない注文だけ注文履歴を1回取得して確認する
+            order_events = self.client.get_order_events()
             
-            # 現在の未約定注文を更新
-            for order in open_orders:
-                if order['order_id'] not in self.active_orders:
-                    self.active_orders[order['order_id']] = order
+            # WebSocketの終了イベントは未約定注文の一覧より新しいため、
+            # 一覧に残っている注文（古いスナップショット）にも適用する
+            ended_ids = [order_id for order_id in order_events if order_id in open_order_ids]
             
-            return filled_orders
+            if any(order_id not in order_events for order_id in missing_ids):
+                for hist_order in self.client.get_order_history(limit=100):
+                    order_events.setdefault(hist_order['order_id'], hist_order)
+            
+            # 未追跡の注文を先に登録してから、終了した注文を反映する
+            self.submit(self.CMD_OPEN_ORDERS, open_orders)
+            for order_id in missing_ids + ended_ids:
+                hist_order = order_events.get(order_id)
+                if hist_order:
+                    self.submit(self.CMD_ORDER_UPDATE, order_id, hist_order['status'], hist_order.get('reject_reason', ''))
+                else:
+                    self.submit(self.CMD_ORDER_UPDATE, order_id, None, '')
             
         except Exception as e:
             self.logger.error(f"Error tracking orders: {e}")
-            return filled_orders
+        
+        return self.run_once()
+    
+    def _apply_order_update(self, order_id: str, order_status: Optional[str], reject_reason: str,
+                            filled_orders: Dict[str, List]):
+        """
+        未約定でなくなった注文のステータスを反映
+        
+        Args:
+            order_id: 注文ID
+            order_status: 注文ステータス（不明ならNone）
+            reject_reason: キャンセル・拒否の理由
+            filled_orders: 約定した注文を追加するリスト
+        """
+        order_info = self.active_orders.pop(order_id, None)
+        if order_info is None:
+            return
+        
+        try:
+            # Filledステータスの場合のみ約定処理
+            if order_status == 'Filled':
+                self.logger.info("Order filled: %s @ %.2f", order_info['side'], order_info['price'])
+                
+                # 約定処理
+                self.handle_filled_order(order_info)
+                
+                # リストに追加
+                if order_info['side'] == 'Buy':
+                    filled_orders['buy_filled'].append(order_info)
+                else:
+                    filled_orders['sell_filled'].append(order_info)
+            elif order_status == 'Cancelled':
+                reason_msg = f" (Reason: {reject_reason})" if reject_reason else ""
+                self.logger.warning("Order cancelled: %s @ %.2f%s", order_info['side'], order_info['price'], reason_msg)
+            elif order_status == 'Rejected':
+                reason_msg = f" (Reason: {reject_reason})" if reject_reason else ""
+                self.logger.warning("Order rejected: %s @ %.2f%s", order_info['side'], order_info['price'], reason_msg)
+            else:
+                self.logger.debug(
+                    "Order removed (status: %s): %s @ %.2f", order_status, order_info['side'], order_info['price']
+                )
+            
+            if order_status != 'Filled':
+                # 約定しなかった対向注文のペア情報は不要
+                self.counter_to_parent.pop(order_id, None)
+                
+        except Exception as e:
+            self.logger.error(f"Error applying order update: {e}")
     
     def handle_filled_order(self, order: Dict):
         """
@@ -119,10 +214,7 @@ class PositionManager:
             qty = order['qty']
             
             # 手数料計算
-            fee = price * qty * self.config.maker_fee
-            
-            # 対向注文を生成
-            self.place_counter_order(order)
+            fee = price * qty * self._fee
             
             # 損益計算（ペアが完成した場合）
             pnl = self.calculate_pnl(order)
@@ -145,61 +237,83 @@ class PositionManager:
                 is_win = pnl > 0
                 self.risk_manager.record_trade(pnl, is_win)
             
-            # 約定履歴に追加
+            # 約定履歴に追加（上限を超えた古い注文は索引からも外す）
+            if len(self.filled_orders) == self.filled_orders.maxlen:
+                self.filled_by_id.pop(self.filled_orders[0]['order_id'], None)
             self.filled_orders.append(order)
+            self.filled_by_id[order['order_id']] = order
+            self.filled_count += 1
+            
+            # ペア情報が履歴の2倍を超えたら、元の注文が履歴から外れたものを捨てる
+            if len(self.counter_to_parent) > 2 * self.filled_orders.maxlen:
+                self._prune_pairs()
             
         except Exception as e:
             self.logger.error(f"Error handling filled order: {e}")
     
-    def place_counter_order(self, filled_order: Dict):
+    def _prune_pairs(self):
+        """元の約定注文が履歴から外れた（損益を計算できない）ペア情報を削除"""
+        filled_by_id = self.filled_by_id
+        self.counter_to_parent = {
+            counter_id: parent_id
+            for counter_id, parent_id in self.counter_to_parent.items()
+            if parent_id in filled_by_id
+        }
+    
+    def place_counter_orders(self, filled_orders: List[Dict]):
         """
-        約定した注文の対向注文を配置
+        約定した注文の対向注文をまとめて配置
         
         Args:
-            filled_order: 約定した注文
+            filled_orders: 約定した注文のリスト
         """
         try:
-            side = filled_order['side']
-            price = filled_order['price']
-            qty = filled_order['qty']
+            n = len(filled_orders)
+            prices = np.fromiter((o['price'] for o in filled_orders), dtype=np.float64, count=n)
+            is_buy = np.fromiter((o['side'] == 'Buy' for o in filled_orders), dtype=bool, count=n)
             
-            # グリッド間隔を取得
+            # 買いが約定したら上に売り、売りが約定したら下に買いを置く
             grid_step = self.strategy.grid_step
+            counter_prices = np.where(is_buy, prices + grid_step, prices - grid_step)
             
-            # 対向注文の価格を計算
-            if side == 'Buy':
-                # 買いが約定したら、上に売り注文
-                counter_price = price + grid_step
-                counter_side = 'Sell'
-            else:
-                # 売りが約定したら、下に買い注文
-                counter_price = price - grid_step
-                counter_side = 'Buy'
-            
-            # 価格がグリッド範囲内かチェック
+            # 価格がグリッド範囲内の対向注文だけを残す
             lower, upper = self.strategy.grid_range
-            if counter_price < lower or counter_price > upper:
-                self.logger.debug(f"Counter order price {counter_price:.2f} out of range")
+            in_range = (counter_prices >= lower) & (counter_prices <= upper)
+            
+            parents = []
+            requests = []
+            for filled_order, counter_price, buy, ok in zip(
+                    filled_orders, counter_prices.tolist(), is_buy.tolist(), in_range.tolist()):
+                if not ok:
+                    self.logger.debug("Counter order price %.2f out of range", counter_price)
+                    continue
+                parents.append(filled_order['order_id'])
+                requests.append({
+                    'side': 'Sell' if buy else 'Buy',
+                    'qty': filled_order['qty'],
+                    'price': counter_price
+                })
+            
+            if not requests:
                 return
             
-            # 対向注文を配置
-            order = self.client.place_limit_order(
-                side=counter_side,
-                qty=qty,
-                price=counter_price
-            )
+            # 対向注文を一括発注
+            results = self.client.place_limit_orders_batch(requests)
             
-            if order:
+            for parent_id, order in zip(parents, results):
+                if not order:
+                    continue
+                
                 # アクティブ注文に追加
                 self.active_orders[order['order_id']] = order
                 
                 # ペアを記録
-                self.order_pairs[filled_order['order_id']].append(order['order_id'])
+                self.counter_to_parent[order['order_id']] = parent_id
                 
-                self.logger.debug(f"Counter order placed: {counter_side} @ {counter_price:.2f}")
+                self.logger.debug("Counter order placed: %s @ %.2f", order['side'], order['price'])
             
         except Exception as e:
-            self.logger.error(f"Error placing counter order: {e}")
+            self.logger.error(f"Error placing counter orders: {e}")
     
     def calculate_pnl(self, order: Dict) -> float:
         """
@@ -216,40 +330,25 @@ class PositionManager:
             order_id = order['order_id']
             
             # この注文がペアの一部かチェック
-            for pair_id, counter_ids in self.order_pairs.items():
-                if order_id in counter_ids:
-                    # ペアが見つかった
-                    # 元の注文を探す
-                    original_order = None
-                    for filled in self.filled_orders:
-                        if filled['order_id'] == pair_id:
-                            original_order = filled
-                            break
+            parent_id = self.counter_to_parent.pop(order_id, None)
+            if parent_id:
+                # ペアが見つかった
+                # 元の注文を探す
+                original_order = self.filled_by_id.get(parent_id)
+                
+                if original_order:
+                    # 損益計算（買い→売り・売り→買いのどちらも同じ式）
+                    # 価格はティック数、数量は刻み数の整数で計算し、最後に1回だけUSDTに換算する
+                    client = self.client
+                    if original_order['side'] == 'Buy':
+                        buy_ticks, sell_ticks = client.to_ticks(original_order['price']), client.to_ticks(order['price'])
+                    else:
+                        buy_ticks, sell_ticks = client.to_ticks(order['price']), client.to_ticks(original_order['price'])
+                    lots = client.to_lots(order['qty'])
                     
-                    if original_order:
-                        # 損益計算
-                        if original_order['side'] == 'Buy':
-                            # 買い→売りのペア
-                            buy_price = original_order['price']
-                            sell_price = order['price']
-                            qty = order['qty']
-                            
-                            gross_pnl = (sell_price - buy_price) * qty
-                            fees = (buy_price + sell_price) * qty * self.config.maker_fee
-                            net_pnl = gross_pnl - fees
-                            
-                            return net_pnl
-                        else:
-                            # 売り→買いのペア
-                            sell_price = original_order['price']
-                            buy_price = order['price']
-                            qty = order['qty']
-                            
-                            gross_pnl = (sell_price - buy_price) * qty
-                            fees = (buy_price + sell_price) * qty * self.config.maker_fee
-                            net_pnl = gross_pnl - fees
-                            
-                            return net_pnl
+                    gross = (sell_ticks - buy_ticks) * lots * self._fee_den
+                    fees = (buy_ticks + sell_ticks) * lots * self._fee_num
+                    return (gross - fees) * client.tick_lot_value / self._fee_den
             
             return 0.0
             
@@ -257,10 +356,16 @@ class PositionManager:
             self.logger.error(f"Error calculating PnL: {e}")
             return 0.0
     
-    def update_position_info(self):
-        """ポジション情報を更新"""
+    def update_position_info(self, position: Optional[Dict] = None):
+        """
+        ポジション情報を更新
+        
+        Args:
+            position: 取得済みのポジション情報（省略時はAPIから取得）
+        """
         try:
-            position = self.client.get_position()
+            if position is None:
+                position = self.client.get_position()
             
             if position:
                 self.current_position = position
@@ -268,7 +373,7 @@ class PositionManager:
                 self.position_entry_price = position['entry_price']
                 
                 self.logger.debug(
-                    f"Position: {position['side']} {position['size']} @ {position['entry_price']:.2f}"
+                    "Position: %s %s @ %.2f", position['side'], position['size'], position['entry_price']
                 )
             
         except Exception as e:
@@ -303,17 +408,19 @@ class PositionManager:
         try:
             self.logger.info("Rebalancing grid...")
             
-            # 既存の注文をキャンセル
-            self.client.cancel_all_orders()
-            time.sleep(1)
-            
-            # アクティブ注文をクリア
+            # 未適用のコマンドを反映してからアクティブ注文をクリア
+            self.run_once()
             self.active_orders.clear()
             
-            # グリッドを更新
-            if not self.strategy.update_grid(order_size):
+            # グリッドを更新（既存の注文は新しいグリッドと突き合わせ、差分だけを入れ替える）
+            placed_orders = self.strategy.update_grid(order_size)
+            if placed_orders is None:
                 return False
             
+            # 残した注文・新規注文をすぐにアクティブ注文として登録（次の追跡までの約定も対向注文の対象にする）
+            for order in placed_orders['buy_orders'] + placed_orders['sell_orders']:
+                self.active_orders[order['order_id']] = order
+            
             return True
             
         except Exception as e:
@@ -329,7 +436,7 @@ class PositionManager:
         """
         return {
             'active_orders': len(self.active_orders),
-            'filled_orders': len(self.filled_orders),
+            'filled_orders': self.filled_count,
             'position_size': self.position_size,
             'position_entry_price': self.position_entry_price
         }
@@ -344,7 +451,7 @@ if __name__ == "__main__":
     from grid_strategy import GridStrategy
     from risk_manager import RiskManager
     
-    config = Config()
+    config = Config.from_yaml()
     logger = BotLogger(config)
     client = BybitClient(config, logger)
     analyzer = MarketAnalyzer(config, logger, client)
@@ -0,0 +1,41 @@
+"""
+レート制限モジュール
+トークンバケット方式でAPI呼び出しの頻度を制御
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """スレッドセーフなトークンバケット"""
+
+    def __init__(self, rate: float, capacity: int = None):
+        """
+        初期化
+
+        Args:
+            rate: 1秒あたりに補充するトークン数（許可するリクエスト数/秒）
+            capacity: バケットの容量（連続して即時に許可する最大数。デフォルト: rate）
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1つ取得（不足している場合は補充されるまで待機）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+
+                wait = (1.0 - self._tokens) / self.rate
+
+            time.sleep(wait)
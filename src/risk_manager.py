@@ -3,6 +3,7 @@
 損失限界チェック、ポジションサイズ制御、自動損切り
 """
 
+import time
 from typing import Dict, Tuple, Optional
 from datetime import datetime, timedelta
 
@@ -10,6 +11,16 @@ from datetime import datetime, timedelta
 class RiskManager:
     """リスク管理クラス"""
     
+    # 毎サイクル参照する属性をスロットに固定（インスタンス辞書を持たない）
+    __slots__ = (
+        'config', 'logger', 'client',
+        'start_balance', 'start_date', '_utc_offset', '_start_day',
+        'daily_start_balance', 'peak_balance',
+        'total_trades', 'winning_trades', 'total_pnl',
+        'trading_stopped', 'stop_reason',
+        '_stop_cache', '_sl_mult'
+    )
+    
     def __init__(self, config, logger, bybit_client):
         """
         初期化
@@ -25,7 +36,9 @@ class RiskManager:
         
         # 状態管理
         self.start_balance = 0.0
-        self.start_date = None
+        self.start_date = None  # 表示用（日付の判定は_start_dayで行う）
+        self._utc_offset = time.localtime().tm_gmtoff  # ローカル時刻のUTCからのずれ（秒）
+        self._start_day = self._local_day()
         self.daily_start_balance = 0.0
         self.peak_balance = 0.0
         self.total_trades = 0
@@ -33,6 +46,15 @@ class RiskManager:
         self.total_pnl = 0.0
         self.trading_stopped = False
         self.stop_reason = None
+        
+        # 直前に「停止不要」と判定したときの入力（同じ入力なら再計算しない）
+        self._stop_cache: Optional[tuple] = None
+        
+        # 損切り価格の倍率（ポジション方向ごとに事前計算）
+        self._sl_mult = {
+            "Buy": 1.0 - config.stop_loss_percent,
+            "Sell": 1.0 + config.stop_loss_percent
+        }
     
     def initialize(self) -> bool:
         """
@@ -51,14 +73,19 @@ class RiskManager:
             self.daily_start_balance = balance['total']
             self.peak_balance = balance['total']
             self.start_date = datetime.now()
+            self._start_day = self._local_day()
             
-            self.logger.info(f"Risk manager initialized with balance: {self.start_balance:.2f} USDT")
+            self.logger.info("Risk manager initialized with balance: %.2f USDT", self.start_balance)
             return True
             
         except Exception as e:
-            self.logger.error(f"Error initializing risk manager: {e}")
+            self.logger.error("Error initializing risk manager: %s", e)
             return False
     
+    def _local_day(self) -> int:
+        """ローカル日付の通し番号（1970-01-01からの日数）"""
+        return int((time.time() + self._utc_offset) // 86400)
+    
     def check_daily_loss(self, current_balance: float) -> Tuple[bool, Optional[str]]:
         """
         日次損失限界をチェック
@@ -70,10 +97,14 @@ class RiskManager:
             (限界到達, 理由)
         """
         # 日付が変わったら日次残高をリセット
-        if datetime.now().date() > self.start_date.date():
+        today = self._local_day()
+        if today > self._start_day:
             self.daily_start_balance = current_balance
             self.start_date = datetime.now()
-            self.logger.info(f"Daily balance reset: {current_balance:.2f} USDT")
+            # 夏時間の切り替えに追従するためUTCからのずれも取り直す
+            self._utc_offset = time.localtime().tm_gmtoff
+            self._start_day = self._local_day()
+            self.logger.info("Daily balance reset: %.2f USDT", current_balance)
         
         # 損失率を計算
         loss = self.daily_start_balance - current_balance
@@ -157,8 +188,8 @@ class RiskManager:
         
         if profit_percent >= self.config.daily_profit_target:
             self.logger.info(
-                f"Daily profit target reached: {profit_percent * 100:.2f}% "
-                f"(target: {self.config.daily_profit_target * 100:.2f}%)"
+                "Daily profit target reached: %.2f%% (target: %.2f%%)",
+                profit_percent * 100, self.config.daily_profit_target * 100
             )
             return True
         
@@ -178,6 +209,10 @@ class RiskManager:
         if self.trading_stopped:
             return True, self.stop_reason
         
+        # 残高・ピーク残高・日次開始残高・日付が前回と同じなら判定も同じ
+        if self._stop_key(current_balance) == self._stop_cache:
+            return False, None
+        
         # 日次損失チェック
         should_stop, reason = self.check_daily_loss(current_balance)
         if should_stop:
@@ -200,8 +235,19 @@ class RiskManager:
             self.stop_reason = reason
             return True, reason
         
+        # ピーク残高等の更新後の値で記録する
+        self._stop_cache = self._stop_key(current_balance)
         return False, None
     
+    def _stop_key(self, current_balance: float) -> tuple:
+        """should_stop_tradingの判定に影響する入力"""
+        return (
+            round(current_balance, 4),
+            round(self.peak_balance, 4),
+            round(self.daily_start_balance, 4),
+            self._local_day()
+        )
+    
     def calculate_stop_loss_price(self, 
                                   entry_price: float,
                                   side: str) -> float:
@@ -215,14 +261,8 @@ class RiskManager:
         Returns:
             損切り価格
         """
-        if side == "Buy":
-            # ロングポジションの損切り
-            stop_loss = entry_price * (1 - self.config.stop_loss_percent)
-        else:
-            # ショートポジションの損切り
-            stop_loss = entry_price * (1 + self.config.stop_loss_percent)
-        
-        return stop_loss
+        # ロングは下方、ショート（Buy以外）は上方に損切り
+        return entry_price * self._sl_mult.get(side, self._sl_mult["Sell"])
     
     def record_trade(self, pnl: float, is_win: bool):
         """
@@ -290,26 +330,31 @@ class RiskManager:
         Returns:
             リスクメトリクス
         """
-        drawdown = 0.0
-        if self.peak_balance > 0:
-            drawdown = ((self.peak_balance - current_balance) / self.peak_balance) * 100
-        
-        daily_loss = 0.0
-        if self.daily_start_balance > 0:
-            daily_loss = ((self.daily_start_balance - current_balance) / self.daily_start_balance) * 100
+        # 各比率の分母は1回だけ逆数（%換算込み）にして、以降は乗算で求める
+        start = self.start_balance
+        daily_start = self.daily_start_balance
+        peak = self.peak_balance
+        total_trades = self.total_trades
+        inv_start = 100.0 / start if start != 0 else 0.0
+        inv_daily = 100.0 / daily_start if daily_start != 0 else 0.0
+        inv_peak = 100.0 / peak if peak > 0 else 0.0
+        inv_trades = 100.0 / total_trades if total_trades else 0.0
+        
+        daily_return = (current_balance - daily_start) * inv_daily
+        daily_loss = -daily_return if daily_start > 0 else 0.0
         
         return {
             'start_balance': self.start_balance,
             'current_balance': current_balance,
             'peak_balance': self.peak_balance,
             'daily_start_balance': self.daily_start_balance,
-            'total_return': self.get_total_return(current_balance),
-            'daily_return': self.get_daily_return(current_balance),
-            'drawdown': drawdown,
+            'total_return': (current_balance - start) * inv_start,
+            'daily_return': daily_return,
+            'drawdown': (peak - current_balance) * inv_peak,
             'daily_loss': daily_loss,
             'total_trades': self.total_trades,
             'winning_trades': self.winning_trades,
-            'win_rate': self.get_win_rate(),
+            'win_rate': self.winning_trades * inv_trades,
             'total_pnl': self.total_pnl,
             'trading_stopped': self.trading_stopped,
             'stop_reason': self.stop_reason
@@ -330,7 +375,7 @@ if __name__ == "__main__":
     from logger import BotLogger
     from bybit_client import BybitClient
     
-    config = Config()
+    config = Config.from_yaml()
     logger = BotLogger(config)
     client = BybitClient(config, logger)
     risk_manager = RiskManager(config, logger, client)
@@ -6,7 +6,9 @@ import os
 import time
 import hmac
 import hashlib
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -29,39 +31,43 @@ print("=" * 60)
 BASE_URL = "https://api.bybit.com"
 RECV_WINDOW = "5000"
 
-def generate_signature(params: str, api_secret: str) -> str:
+# HTTPセッション（keep-aliveで接続を再利用）
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# 固定ヘッダーはセッションに1回だけ設定（リクエストごとには署名とタイムスタンプのみ渡す）
+SESSION.headers.update({
+    'X-BAPI-API-KEY': api_key,
+    'X-BAPI-RECV-WINDOW': RECV_WINDOW,
+    'Content-Type': 'application/json'
+})
+
+# 残高取得のクエリ文字列（パラメータが固定なのでキー順に並べた形で保持）
+BALANCE_QS = "accountType=UNIFIED"
+
+# 秘密鍵でipad/opadを適用済みのHMAC状態（署名ごとにコピーして使う）
+_HMAC_BASE = hmac.new(api_secret.encode('utf-8'), digestmod=hashlib.sha256)
+
+def generate_signature(params: str) -> str:
     """署名を生成"""
-    return hmac.new(
-        api_secret.encode('utf-8'),
-        params.encode('utf-8'),
-        hashlib.sha256
-    ).hexdigest()
+    h = _HMAC_BASE.copy()
+    h.update(params.encode('utf-8'))
+    return h.hexdigest()
 
 def get_wallet_balance():
     """残高を取得"""
-    timestamp = str(int(time.time() * 1000))
-    
-    # パラメータ
-    params = {
-        'accountType': 'UNIFIED'
-    }
-    
-    # クエリ文字列を作成
-    query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
+    timestamp = str(time.time_ns() // 1_000_000)
     
     # 署名用の文字列を作成
-    param_str = f"{timestamp}{api_key}{RECV_WINDOW}{query_string}"
+    param_str = f"{timestamp}{api_key}{RECV_WINDOW}{BALANCE_QS}"
     
     # 署名を生成
-    signature = generate_signature(param_str, api_secret)
+    signature = generate_signature(param_str)
     
-    # ヘッダーを設定
+    # ヘッダーを設定（固定ヘッダーはセッションに設定済み）
     headers = {
-        'X-BAPI-API-KEY': api_key,
         'X-BAPI-SIGN': signature,
-        'X-BAPI-TIMESTAMP': timestamp,
-        'X-BAPI-RECV-WINDOW': RECV_WINDOW,
-        'Content-Type': 'application/json'
+        'X-BAPI-TIMESTAMP': timestamp
     }
     
     # リクエストを送信
@@ -70,11 +76,11 @@ def get_wallet_balance():
     print(f"\nRequest URL: {url}")
     print(f"Sending request...")
     
-    response = requests.get(url, params=params, headers=headers)
+    response = SESSION.get(f"{url}?{BALANCE_QS}", headers=headers)
     
     print(f"Response Status: {response.status_code}")
     
-    return response.json()
+    return orjson.loads(response.content)
 
 # テスト実行
 try: